@@ -12,19 +12,45 @@ Classes
 TimestepCue(Resource)
     Wait for a post request from the movement analysis software, processes its contents, and returns an appropriate
     response.
+UtteranceComplete(Resource)
+    Receive an acknowledgement from the robot that it has finished an utterance.
 """
 
-import requests
 from flask import Flask, request
 from flask_restful import Resource, Api, reqparse
 import logging
 
-from CoachingBehaviourTree import config
+from CoachingBehaviourTree import config, sync, screen_updates, prefetch
 
 # Create the instance of the flask app and api, which is started from the controller.
 app = Flask('policy_guide_api')
 api = Api(app)
 
+
+def _timeout_response(goal_level):
+    """
+    Response sent to the app if the behaviour tree hasn't finished with a goal level within config.api_wait_timeout.
+    :param goal_level :type int: the goal level we were waiting for.
+    :return:type tuple(dict, int): the response data and HTTP status code.
+    """
+    logging.warning("Timed out waiting for behaviour tree at goal level " + str(goal_level))
+    new_data = {
+        'goal_level': goal_level,
+        'completed': config.completed
+    }
+    return new_data, 503
+
+
+@app.after_request
+def _wake_tree(response):
+    """
+    Every request changes config values which the behaviour tree may be waiting on, so wake the tree once it has been
+    handled.
+    """
+    sync.wake_tree()
+    return response
+
+
 class TimestepCue(Resource):
     """
     Wait for a post request from the movement analysis software, processes its contents, and returns an appropriate
@@ -47,8 +73,9 @@ class TimestepCue(Resource):
                     config.completed = config.COMPLETED_STATUS_UNDEFINED
 
                     # Wait for the behaviour tree to execute for the person goal.
-                    while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                        pass
+                    if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                           config.api_wait_timeout):
+                        return _timeout_response(config.PERSON_GOAL)
 
                     new_data = {
                         'goal_level': 0,
@@ -74,8 +101,9 @@ class TimestepCue(Resource):
                         config.session_finished = True
 
                         # Wait for the behaviour tree to execute for the session goal.
-                        while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                            pass
+                        if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.SESSION_GOAL)
 
                         new_data = {
                             'goal_level': 1,
@@ -110,8 +138,9 @@ class TimestepCue(Resource):
                         config.performance = None
 
                         # Wait until the behaviour tree has executed for the session goal and the user/system has chosen a shot (exercise in general) which has been confirmed.
-                        while config.completed == config.COMPLETED_STATUS_UNDEFINED or config.shot is None or not config.shot_confirmed:
-                            pass
+                        if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED and config.shot is not None and config.shot_confirmed,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.SESSION_GOAL)
 
                         new_data = {
                             'goal_level': 1,
@@ -146,8 +175,9 @@ class TimestepCue(Resource):
                         config.completed = config.COMPLETED_STATUS_FALSE
                         config.shot_finished = True
 
-                        while config.completed == config.COMPLETED_STATUS_FALSE:
-                            pass
+                        if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_FALSE,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.EXERCISE_GOAL)
 
                         new_data = {
                             'goal_level': "2",
@@ -157,8 +187,9 @@ class TimestepCue(Resource):
                         # If the user has chosen to stop the session early, we need to check if we are at an appropriate place to continue and send data back to the tracking layer.
                         # If we are not at an appropriate place, we need to wait for the behaviour tree to execute and tidy things up so that we can return appropriate data and communicate that the session is stopping.
                         logging.debug("config.tidying = " + str(config.tidying) + ", len(config.shots_dealt_with) = " + str(len(config.shots_dealt_with)) + ", config.stat_confirmed = " + str(config.stat_confirmed) + ", config.stat_count = " + str(config.stat_count))
-                        while not config.tidying and ((not config.shot_confirmed or not len(config.shots_dealt_with) == 0) or (not config.stat_confirmed and config.stat_count <= config.STATS_PER_SHOT and config.stat_count != 0)):
-                            pass
+                        if not sync.wait_until(lambda: config.tidying or (config.shot_confirmed and len(config.shots_dealt_with) == 0 and (config.stat_confirmed or config.stat_count > config.STATS_PER_SHOT or config.stat_count == 0)),
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.EXERCISE_GOAL)
 
                         config.stat_confirmed = False
 
@@ -207,8 +238,9 @@ class TimestepCue(Resource):
                                 config.hand = content['hand']
 
                             # Wait for the behaviour tree to execute.
-                            while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                                pass
+                            if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                                   config.api_wait_timeout):
+                                return _timeout_response(config.EXERCISE_GOAL)
 
                             new_data = {
                                 'goal_level': 2,
@@ -272,8 +304,9 @@ class TimestepCue(Resource):
                             config.completed = config.COMPLETED_STATUS_TRUE
 
                             logging.debug("waiting for config.stat")
-                            while config.stat_confirmed is False:
-                                pass
+                            if not sync.wait_until(lambda: config.stat_confirmed is not False,
+                                                   config.api_wait_timeout):
+                                return _timeout_response(config.EXERCISE_GOAL)
 
                             logging.debug("returning stat data to app: " + config.stat)
                             config.used_stats.append(config.stat)
@@ -335,8 +368,9 @@ class TimestepCue(Resource):
                         config.completed = config.COMPLETED_STATUS_UNDEFINED
                         config.stat_finished = True
 
-                        while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                            pass
+                        if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.STAT_GOAL)
 
                         new_data = {
                             'goal_level': 3,
@@ -347,8 +381,9 @@ class TimestepCue(Resource):
                             new_data["final"] = 1
                         else:
                             # Wait for behaviour tree to execute until the stat choice is confirmed.
-                            while config.stat_confirmed is False:
-                                pass
+                            if not sync.wait_until(lambda: config.stat_confirmed is not False,
+                                                   config.api_wait_timeout):
+                                return _timeout_response(config.STAT_GOAL)
                             config.stat_confirmed = False
                             logging.debug("New stat = " + str(config.stat))
                             new_data["stat"] = config.stat
@@ -374,8 +409,9 @@ class TimestepCue(Resource):
                             logging.debug("Setting config.performance to None.")
                             config.performance = None
 
-                        while config.completed != config.COMPLETED_STATUS_FALSE:
-                            pass
+                        if not sync.wait_until(lambda: config.completed == config.COMPLETED_STATUS_FALSE,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.STAT_GOAL)
 
                         new_data = {
                             'goal_level': 3,
@@ -438,9 +474,13 @@ class TimestepCue(Resource):
                         config.phase = config.PHASE_END
                         config.completed = config.COMPLETED_STATUS_UNDEFINED
                         config.set_finished = True
+                        # Start preparing the feedback while the behaviour tree catches up.
+                        prefetch.speculate(config.SET_GOAL, config.performance, config.PHASE_END, config.avg_score,
+                                           config.target)
 
-                        while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                            pass
+                        if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.SET_GOAL)
 
                         new_data = {
                             'goal_level': 4,
@@ -473,8 +513,9 @@ class TimestepCue(Resource):
                         config.completed = config.COMPLETED_STATUS_UNDEFINED
 
                         logging.debug("Waiting")
-                        while config.completed != config.COMPLETED_STATUS_FALSE:
-                            pass
+                        if not sync.wait_until(lambda: config.completed == config.COMPLETED_STATUS_FALSE,
+                                               config.api_wait_timeout):
+                            return _timeout_response(config.SET_GOAL)
 
                         logging.debug("Setting data")
                         new_data = {
@@ -519,12 +560,12 @@ class TimestepCue(Resource):
                         config.goal_level = config.ACTION_GOAL
                         config.shot_count += 1
 
-                        # Send a signal to the screen API asking it to update the robot's screen with the new rep number
-                        requestURL = config.screen_post_address + str(config.shot_count) + "/newRep"
-                        logging.debug('sending request, url = ' + requestURL)
-                        r = requests.post(requestURL)
+                        # Ask the screen API to update the robot's screen with the new rep number. The updates are
+                        # sent in the background so we can respond to the app straight away.
+                        logging.debug('updating rep count = ' + str(config.shot_count))
+                        screen_updates.set_rep_count(config.shot_count)
                         refresh_screen_data = {'silence': 1}
-                        r = requests.post(config.post_address, json=refresh_screen_data)
+                        screen_updates.refresh_silence(refresh_screen_data)
 
                         self.previous_shot_performance = performanceValue
 
@@ -609,8 +650,9 @@ class TimestepCue(Resource):
                 config.sessions = int(args['sessions'])
                 config.ability = int(args['ability'])
 
-                while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                    pass
+                if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                       config.api_wait_timeout):
+                    return _timeout_response(config.PERSON_GOAL)
 
                 return {args['goal_level']: config.completed}, 200
 
@@ -620,8 +662,9 @@ class TimestepCue(Resource):
                 config.goal_level = config.SESSION_GOAL
                 config.performance = int(args['performance'])
 
-                while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                    pass
+                if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                       config.api_wait_timeout):
+                    return _timeout_response(config.SESSION_GOAL)
 
                 new_data = {
                     'completed': config.completed
@@ -638,8 +681,9 @@ class TimestepCue(Resource):
                 config.goal_level = config.EXERCISE_GOAL
                 config.performance = int(args['performance'])
 
-                while config.completed == config.COMPLETED_STATUS_UNDEFINED:
-                    pass
+                if not sync.wait_until(lambda: config.completed != config.COMPLETED_STATUS_UNDEFINED,
+                                       config.api_wait_timeout):
+                    return _timeout_response(config.EXERCISE_GOAL)
 
                 new_data = {
                     'completed': config.completed
@@ -651,7 +695,26 @@ class TimestepCue(Resource):
                 return {args['goal_level']: new_data}, 200
 
 
+class UtteranceComplete(Resource):
+    """
+    Receive an acknowledgement from the robot that it has finished an utterance, so that the behaviour tree can carry
+    on. The robot posts the utterance_id which was sent to it with the utterance.
+    """
+    def post(self):
+        if not request.is_json:
+            return {'message': 'Expected JSON containing utterance_id'}, 400
+        content = request.get_json()
+        try:
+            utterance_id = int(content['utterance_id'])
+        except (KeyError, TypeError, ValueError):
+            return {'message': 'Expected JSON containing utterance_id'}, 400
+        logging.debug("Robot finished utterance " + str(utterance_id))
+        pending = sync.utterance_finished(utterance_id)
+        return {'utterance_id': utterance_id, 'acknowledged': pending}, 200
+
+
 api.add_resource(TimestepCue, '/cue')
+api.add_resource(UtteranceComplete, '/utterance_complete')
 
 # For testing purposes. The Flask app is normally run through the controller.
 if __name__ == '__main__':
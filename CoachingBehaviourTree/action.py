@@ -1,8 +1,23 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from CoachingBehaviourTree import controller, config
 from Policy.policy_wrapper import PolicyWrapper
 
+# Templates for the complete utterance of an action, one for each way the score can be given.
+_TEMPLATES = {
+    "stat_baseline": "{pre_msg}. Your baseline score is {score}{measure} and you are aiming for {target}{measure}. "
+                     "{explanation}",
+    "stat": "{pre_msg}. You got an average score of {score}{measure} and were aiming for {target}{measure}.",
+    "exercise_so_far": "{pre_msg}. You've got an average accuracy of {score} out of 5 so far for your {hand} {shot}s "
+                       "today.",
+    "exercise": "{pre_msg}. You got an average accuracy of {score} out of 5 for your {hand} {shot}s today.",
+    "session_so_far": "{pre_msg}. So far, you've had an average accuracy of {score} out of 5 for all of your shots "
+                      "combined today.",
+    "session": "{pre_msg}. You got an average accuracy of {score} out of 5 for all of your shots combined today.",
+    "no_score": "{pre_msg}",
+}
+_RENDERERS = {variant: template.format for variant, template in _TEMPLATES.items()}
+
 
 @dataclass
 class Action:
@@ -19,6 +34,8 @@ class Action:
         The target score the user was aiming for in the last action they performed.
     post_msg :type str
         The utterance to be spoken by the robot after giving the score information.
+    _rendered :type str
+        The formatted output, or None if it hasn't been formatted since the action was last changed.
 
     Methods
     -------
@@ -39,29 +56,38 @@ class Action:
     hand: str = None
     stat_count: int = 0
     ending: bool = False
+    _rendered: str = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Any change to the action means it has to be formatted again.
+        object.__setattr__(self, name, value)
+        if name != "_rendered":
+            object.__setattr__(self, "_rendered", None)
 
     def __str__(self):
         """
-        Format the output of the data stored in this instance of Action.
+        Format the output of the data stored in this instance of Action. The output is only formatted the first time
+        it is needed after the action changes.
         :return:type str: the complete formatted utterance.
         """
+        if self._rendered is None:
+            self._rendered = self._render()
+        return self._rendered
+
+    def _render(self):
         if self.score is not None and isinstance(self.score, float) and not self.goal == config.ACTION_GOAL:
+            score = round(self.score, 2)
             if self.goal > config.EXERCISE_GOAL:
-                if self.stat_explanation is not None:
-                    return f'{self.pre_msg}. Your baseline score is {round(self.score, 2)}' + self.stat_measure + f' and you are aiming for {round(self.target, 2)}' + self.stat_measure + '. ' + self.stat_explanation
-                else:
-                    return f'{self.pre_msg}. You got an average score of {round(self.score, 2)}' + self.stat_measure + f' and were aiming for {round(self.target, 2)}' + self.stat_measure + '.'
+                variant = "stat" if self.stat_explanation is None else "stat_baseline"
+                return _RENDERERS[variant](pre_msg=self.pre_msg, score=score, target=round(self.target, 2),
+                                           measure=self.stat_measure, explanation=self.stat_explanation)
+            elif self.goal == config.EXERCISE_GOAL:
+                variant = "exercise_so_far" if self.stat_count < config.STATS_PER_SHOT else "exercise"
+                return _RENDERERS[variant](pre_msg=self.pre_msg, score=score, shot=self.shot,
+                                           hand="backhand" if self.hand == "BH" else "forehand")
             else:
-                if self.goal == config.EXERCISE_GOAL:
-                    if self.stat_count < config.STATS_PER_SHOT:
-                        return f'{self.pre_msg}. You\'ve got an average accuracy of {round(self.score, 2)} out of 5 so far for your {"backhand" if self.hand == "BH" else "forehand"} {self.shot}s today.'
-                    else:
-                        return f'{self.pre_msg}. You got an average accuracy of {round(self.score, 2)} out of 5 for your {"backhand" if self.hand == "BH" else "forehand"} {self.shot}s today.'
-                else:
-                    if not self.ending:
-                        return f'{self.pre_msg}. So far, you\'ve had an average accuracy of {round(self.score, 2)} out of 5 for all of your shots combined today.'
-                    else:
-                        return f'{self.pre_msg}. You got an average accuracy of {round(self.score, 2)} out of 5 for all of your shots combined today.'
+                variant = "session" if self.ending else "session_so_far"
+                return _RENDERERS[variant](pre_msg=self.pre_msg, score=score)
 
             '''if self.goal is not config.ACTION_GOAL:
                 # TODO: add score-specific utterance (e.g. seconds, degrees) to explain the score better to the user.
@@ -104,5 +130,4 @@ class Action:
                         config.given_stat_explanation = True
                         return returnString + stat_explanation'''
         else:
-
-            return f'{self.pre_msg}'
+            return _RENDERERS["no_score"](pre_msg=self.pre_msg)
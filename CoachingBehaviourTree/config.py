@@ -223,6 +223,15 @@ double_set_count_start = 0
 name = "Pepper"
 participantNo = "Default."
 participant_filename = participantNo + "_history.txt"
+policy_store_filename = participantNo + "_policy.npz"
+policy_history_filename = participantNo + "_history.bin"
+# Where data about each participant's sessions is stored (see session_data.py). "text" keeps the original text files,
+# "jsonl" keeps each exercise's data in keyed JSON Lines files, "sqlite" keeps everything in one database per participant.
+session_data_root = "/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/"
+session_data_backend = "text"
+session_db_filename = "SessionData.db"
+session_data_write_behind = True  # Save session data on a background thread rather than in the behaviour tree.
+session_data_sync_delay = 0.2  # Seconds the background thread waits for more writes before syncing them together.
 ability = 2
 motivation = 8
 # 1 = DRIVE, 5 = LOB, 0 = DROP
@@ -239,6 +248,11 @@ alpha = 0.3
 gamma = 0.7
 lambdaValue = 0.6
 epsilon = -1
+# Eligibility traces below this value are ignored (and no longer decayed) by the SARSA(lambda) update.
+trace_threshold = 0.001
+# If True, behaviours are drawn once from the policy renormalised over the valid behaviours, rather than resampled until
+# a valid one comes up.
+masked_sampling = True
 policy_matrix = None
 
 # Robot through Peppernet router\:
@@ -262,5 +276,40 @@ screen_post_address = "http://192.168.1.207:8000/"
 # post_address = "http://192.168.1.115:4999/output"
 # screen_post_address = "http://192.168.1.115:8000/"
 
+# Headless simulator (see Simulator/simulator.py):
+# post_address = "http://localhost:4999/output"
+# screen_post_address = "http://localhost:8000/"
+
 behaviour = -1
 need_new_behaviour = False
+
+# Synchronisation between the API and the behaviour tree (see sync.py).
+sync_poll_interval = 0.5  # Seconds between re-checks of a waiting condition, in case a notification is missed.
+# Seconds the API waits for the behaviour tree before responding with 503, so a stuck tree releases the guide app's
+# request. A few times the longest expected step (a long feedback utterance with a demo, then the user choosing on the
+# robot's screen). None = no limit.
+api_wait_timeout = 180
+tick_idle_timeout = 0.1  # Max seconds the tree is parked while waiting on the guide before it is ticked again.
+# Minimum seconds between the controller's policy steps, by goal level, e.g. {ACTION_GOAL: 1.0}. Goal levels not listed
+# step as soon as the tree asks for a new behaviour.
+step_min_spacing = {}
+
+# HTTP posts to the robot and its screen (see output_client.py).
+http_connect_timeout = 3.05  # Seconds to wait for a connection to the robot or screen.
+http_read_timeout = None  # Seconds to wait for a response. None = no limit, since the robot holds its response while paused.
+http_retries = 3  # Number of times a failed connection is retried before the post is dropped.
+http_retry_backoff = 0.2  # Backoff factor between retries (0.2s, 0.4s, 0.8s, ...).
+http_pool_size = 4  # Number of kept-alive connections per destination.
+screen_frame_interval = 0.1  # Min seconds between rep counter updates (and silence refreshes), see screen_updates.py.
+
+# Acknowledgement of utterances by the robot (see sync.py).
+robot_sends_utterance_acks = False  # True if the robot posts to /utterance_complete when it finishes an utterance.
+utterance_ack_timeout = None  # Seconds to wait for an utterance to be acknowledged before carrying on. None = no limit.
+utterance_seed = None  # Seed for choosing between utterance options, e.g. for reproducible simulations. None = random.
+
+# Preparing the feedback at the end of a set before it is needed (see prefetch.py).
+prefetch_behaviours = 3  # Number of likely feedback behaviours to prepare utterances for. 0 = don't prepare any.
+policy_state = None  # The state the current behaviour was generated from, kept by the controller.
+behaviour_lib = None  # The behaviour library of the session, set when the blackboard is initialised.
+prefetch_demos = False  # True to post {"prefetch_demos": [...]} to the robot when a shot or stat is chosen, so it
+                        # can load the demos in advance. Only enable for robot apps which accept these posts.
@@ -14,7 +14,6 @@ __main__()
 """
 import os
 import threading
-import time
 import logging
 
 from branch import Sequencer, Selector, Progressor, Runner
@@ -22,12 +21,15 @@ from decorator import Until, While, Negate, Repeat, UntilCount, Succeed
 from tree import NodeStatus, Blackboard
 
 from API import api_classes
-from CoachingBehaviourTree import nodes, config
+from CoachingBehaviourTree import nodes, config, output_client, screen_updates, session_data
+from CoachingBehaviourTree.pacer import StepPacer
 from CoachingBehaviourTree.nodes import FormatAction, DisplayBehaviour, CheckForBehaviour, GetBehaviour, GetStats, \
     GetDuration, CreateSubgoal, TimestepCue, DurationCheck, GetChoice, EndSetEvent, InitialiseBlackboard, \
     EndSubgoal, OverrideOption, CheckDoneBefore, CheckCreated, StopCheck
+from Policy import policy_store
 from Policy.coaching_env import CoachingEnvironment
 from Policy.policy import Policy
+from Policy.policy_history import PolicyHistory
 from Policy.policy_wrapper import PolicyWrapper
 
 
@@ -1424,27 +1426,18 @@ def update(state, state2, reward, action, action2):
     logging.debug("State2 = " + str(state2) + ", action2 = " + str(action2))
     logging.debug("Reward = " + str(reward))
     # Expected reward:
-    predict = config.policy_matrix.get_matrix()[state][action]
-    # Next expected reward: config.policy_matrix.get_matrix()[state2][action2]
+    predict = config.policy_matrix.get_value(state, action)
+    # Next expected reward: config.policy_matrix.get_value(state2, action2)
     # TD:
-    target = reward + config.gamma * config.policy_matrix.get_matrix()[state2][action2]
+    target = reward + config.gamma * config.policy_matrix.get_value(state2, action2)
     # TD error: target - predict
     td_error = target - predict
 
     # increment eligibility traces (state, action)
-    config.policy_matrix.update_eligibility_traces(state, action, config.policy_matrix.get_eligibility_traces()[state][action] + 1)
-
-    # For each state action pair:
-    for s in range(len(config.policy_matrix.get_matrix())):
-        # Only do it if >= 0.1 to save time.
-        if sum(config.policy_matrix.get_eligibility_traces()[s]) >= 0.001:
-            for a in range(len(config.policy_matrix.get_matrix()[s])):
-                if config.policy_matrix.get_eligibility_traces()[s][a] >= 0.001:
-                    # Update transition matrix:
-                    config.policy_matrix.update_matrix(s, a, 0.0 if config.policy_matrix.get_matrix()[s][a] + config.alpha * td_error * config.policy_matrix.get_eligibility_traces()[s][a] < 0.0 else config.policy_matrix.get_matrix()[s][a] + config.alpha * td_error * config.policy_matrix.get_eligibility_traces()[s][a])
-                    # config.policy_matrix.get_matrix()[state][action] = config.policy_matrix.get_matrix()[state][action] + config.alpha * (target - predict) * eligibility_traces(state, action)
-                    # Decay E(state, action)
-                    config.policy_matrix.update_eligibility_traces(s, a, config.gamma * config.lambdaValue * config.policy_matrix.get_eligibility_traces()[s][a])
+    config.policy_matrix.update_eligibility_traces(state, action, config.policy_matrix.get_trace(state, action) + 1)
+
+    # Update every state action pair with an active eligibility trace (clamped at 0) and decay its trace.
+    config.policy_matrix.apply_traced_update(config.alpha * td_error, config.gamma * config.lambdaValue)
 
     # config.policy_matrix.update_matrix(state, action, 0.0 if config.policy_matrix.get_matrix()[state][action] + config.alpha * (target - predict) < 0.0 else config.policy_matrix.get_matrix()[state][action] + config.alpha * (target - predict))
     '''else:
@@ -1550,14 +1543,8 @@ def main():
     # else:
     #     logging.debug("The file does not exist")
 
-    if os.path.exists("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt"):
-        sessionsFile = "/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt"
-        f = open(sessionsFile, 'r')
-        file_contents = f.readlines()
-        f.close()
-
-        sessions = int(file_contents[0])
-    else:
+    sessions = session_data.get_session_store().get_session_count()
+    if sessions is None:
         sessions = 0
 
     print("Sessions = " + str(sessions))
@@ -1581,9 +1568,13 @@ def main():
     config.need_new_behaviour = False
     # logging.debug('Got behaviour: ' + str(config.behaviour))
 
+    pacer = StepPacer(config.step_min_spacing)
     while not done:
         logging.debug("controller stepping")
+        config.policy_state = state1
+        pacer.wait(config.goal_level)
         state2, reward, done, result = env.step(action1, state1)
+        pacer.step_finished()
 
         # logging.debug('Behaviour = ' + str(config.behaviour))
         logging.debug("controller getting new behaviour")
@@ -1634,10 +1625,10 @@ def main():
         action1 = action2
 
         logging.debug(result)
-        time.sleep(1)
 
     # Perform final step.
     logging.debug("controller stepping")
+    pacer.wait(config.goal_level)
     state2, reward, done, result = env.step(action1, state1)
 
     # logging.debug('Behaviour = ' + str(config.behaviour))
@@ -1663,38 +1654,34 @@ def main():
     #
     logging.info("New behaviour: " + str(action2))
 
-    # Write final policy to file
-    logging.debug("Writing policy to file: " + filename)
+    # Append final policy to history file. The history is authoritative: its latest policy is what is loaded at the
+    # start of the next session.
+    history = PolicyHistory("/home/martin/PycharmProjects/coachingPolicies/AdaptedPolicies/" + config.policy_history_filename)
+    if len(history) == 0 and os.path.exists(filename):
+        logging.info("Importing text policy history: " + filename)
+        history.import_text(filename)
+    logging.info("Cumulative reward = " + str(config.cumulative_reward))
+    logging.info("Adapted policy = " + str(config.policy_matrix.get_matrix()))
+    sessions_in_history = history.append(config.policy_matrix.get_matrix_array(),
+                                         config.policy_matrix.get_eligibility_traces_array(), config.cumulative_reward)
+    logging.debug("Appended policy to history, " + str(sessions_in_history) + " sessions in history")
+
+    # Only once the append has succeeded, also write the policy to the binary store. This is a copy of the history's
+    # latest policy, only loaded if the history is missing (e.g. the policy file was copied across on its own).
+    store_filename = "/home/martin/PycharmProjects/coachingPolicies/AdaptedPolicies/" + config.policy_store_filename
+    logging.debug("Writing policy to store: " + store_filename)
+    policy_store.save_policy(store_filename, config.policy_matrix.get_matrix_array(),
+                             config.policy_matrix.get_eligibility_traces_array(), config.cumulative_reward)
+
     try:
-        f = open(filename, "r")
-        logging.debug("Opened file for reading")
-        file_contents = f.readlines()
-        logging.debug("Got file contents: " + str(file_contents))
-        f.close()
-        logging.debug("Closed file")
-
-        f = open(filename, "w")
-        logging.debug("Opened file for writing")
-        file_contents.insert(0, str(config.cumulative_reward) + "\n")
-        logging.info("Cunulative reward = " + str(config.cumulative_reward))
-        file_contents.insert(0, str(config.policy_matrix.get_matrix()) + "\n")
-        logging.info("Adapted policy = " + str(config.policy_matrix.get_matrix()))
-        f.writelines(file_contents)
-        logging.debug("written file_contents to file")
-        f.close()
-        logging.debug("Closed file")
-    except:
-        logging.debug("except")
-        f = open(filename, "a")
-        logging.debug("Opened file for append")
-        matrix = config.policy_matrix.get_matrix()
-        logging.debug("matrix = " + str(matrix))
-        lines = [str(config.policy_matrix.get_matrix()) + "\n", str(config.cumulative_reward) + "\n"]
-        logging.debug("Created list " + str(list))
-        f.writelines(lines)  # Write the policy in the first line of the newly created file.
-        logging.debug("Written to file")
-        f.close()
-        logging.debug("closed file")
+        session_data.close_session_store()
+    except Exception:
+        logging.exception("Some of the session data could not be saved")
+
+    # Send anything still queued for the robot or screen and close the pooled connections.
+    screen_updates.flush()
+    output_client.close()
+
 
 def api_start():
     api_classes.app.run(host='0.0.0.0', port=5000)
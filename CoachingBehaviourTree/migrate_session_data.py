@@ -0,0 +1,177 @@
+"""Migrate Session Data
+
+One-shot conversion of participants' session data from the original text files to the keyed JSON Lines files used by
+the "jsonl" session data backend (see session_data.py and session_records.py). For each exercise directory
+(<root>/<participant>/<hand><shot>), Aggregator.txt, Baseline.txt and every <session>.txt are converted to .jsonl files
+alongside them. The text files are left in place, and exercises which already have an Aggregator.jsonl are skipped
+unless --force is given, so the tool can safely be run again.
+
+The text baseline file holds one block of 12 lines per session in which the exercise was done, but not the session
+numbers. Block i is taken to belong to the i-th session file of the exercise (by session number); any extra blocks
+(baselines done in a session which was stopped before a stat was started) are numbered on from the last session file.
+
+Usage: python -m CoachingBehaviourTree.migrate_session_data [--root ROOT] [--force] [participant ...]
+...
+Methods
+-------
+migrate_participant(root, participant, force)
+    Convert every exercise of a participant.
+migrate_exercise(directory, force)
+    Convert the text files of one exercise directory.
+"""
+import argparse
+import logging
+import os
+
+from CoachingBehaviourTree import config, session_records
+from CoachingBehaviourTree.session_data import BASELINE_STATS
+
+
+def migrate_participant(root, participant, force=False):
+    """
+    Convert every exercise of a participant from text files to JSON Lines files.
+    :param root :type str: the directory containing a directory of data for each participant.
+    :param participant :type str: the participant number.
+    :param force :type bool: if True, overwrite exercises which have already been converted.
+    :return:type int: the number of exercises converted.
+    """
+    directory = os.path.join(root, participant)
+    migrated = 0
+    for name in sorted(os.listdir(directory)):
+        exercise_directory = os.path.join(directory, name)
+        if os.path.isdir(exercise_directory) and migrate_exercise(exercise_directory, force):
+            migrated += 1
+    return migrated
+
+
+def migrate_exercise(directory, force=False):
+    """
+    Convert the text files of one exercise directory (<hand><shot>) to JSON Lines files.
+    :param directory :type str: the exercise directory.
+    :param force :type bool: if True, overwrite an exercise which has already been converted.
+    :return:type bool: True if the exercise was converted, False if it was skipped.
+    """
+    aggregator_text = os.path.join(directory, "Aggregator.txt")
+    if not os.path.exists(aggregator_text):
+        return False
+    if os.path.exists(os.path.join(directory, "Aggregator.jsonl")) and not force:
+        logging.info("Skipping " + directory + ", already converted")
+        return False
+
+    sessions = sorted(int(name[:-len(".txt")]) for name in os.listdir(directory)
+                      if name.endswith(".txt") and name[:-len(".txt")].isdigit())
+    for session in sessions:
+        records = _convert_session(_read_lines(os.path.join(directory, str(session) + ".txt")))
+        session_records.write_records(os.path.join(directory, str(session) + ".jsonl"), records)
+
+    _convert_aggregator(_read_lines(aggregator_text)).write(os.path.join(directory, "Aggregator.jsonl"))
+
+    baseline_text = os.path.join(directory, "Baseline.txt")
+    if os.path.exists(baseline_text):
+        _convert_baseline(_read_lines(baseline_text), sessions).write(os.path.join(directory, "Baseline.jsonl"))
+    logging.info("Converted " + directory)
+    return True
+
+
+def _read_lines(filename):
+    with open(filename, "r") as f:
+        return [line.strip() for line in f if line.strip() != ""]
+
+
+def _number(value):
+    """
+    Parse a number written with str(), keeping ints as ints. "None" (and anything else unparseable) becomes None.
+    """
+    value = value.strip().strip(",").strip()
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return None
+
+
+def _fields(line):
+    return [field for field in line.split(", ") if field.strip() != ""]
+
+
+def _is_stat_name(line):
+    return ", " not in line and _number(line) is None and line != "None"
+
+
+def _convert_aggregator(lines):
+    aggregator = session_records.AggregatorRecords(_number(lines[0]) if lines else 0.0,
+                                                   _number(lines[1]) if len(lines) > 1 else None)
+    index = 2
+    while index + 1 < len(lines):
+        fields = _fields(lines[index + 1]) + [None, None, None]
+        aggregator.set_stat(lines[index], _number(fields[0]) if fields[0] else None,
+                            _number(fields[1]) if fields[1] else None, _number(fields[2]) if fields[2] else None)
+        index += 2
+    return aggregator
+
+
+def _convert_baseline(lines, sessions):
+    baseline = session_records.BaselineRecords()
+    blocks = [lines[i:i + 2 * len(BASELINE_STATS)] for i in range(0, len(lines), 2 * len(BASELINE_STATS))]
+    for block_index, block in enumerate(blocks):
+        if block_index < len(sessions):
+            session = sessions[block_index]
+        else:
+            session = (sessions[-1] if sessions else 0) + block_index - len(sessions) + 1
+        stats = []
+        for index in range(0, len(block) - 1, 2):
+            stat, values = block[index], block[index + 1]
+            stats.append(stat)
+            if values == "0":  # Baseline started but not filled in.
+                continue
+            fields = _fields(values) + [None, None, None]
+            baseline.set(session, stat, _number(fields[0]), _number(fields[1]),
+                         _number(fields[2]) if fields[2] else None)
+        for stat in stats:
+            if (session, stat) not in baseline.baselines:
+                baseline.start(session, [stat])
+    return baseline
+
+
+def _convert_session(lines):
+    records = []
+    index = 0
+    # A finished exercise starts with its score and performance.
+    if len(lines) > 1 and not _is_stat_name(lines[0]):
+        exercise = {"record": "exercise", "score": _number(lines[0]), "performance": _number(lines[1])}
+        index = 2
+    else:
+        exercise = None
+    stat = None
+    while index < len(lines):
+        line = lines[index]
+        fields = _fields(line)
+        if _is_stat_name(line):
+            stat = line
+            records.append({"record": "stat_start", "stat": stat})
+        elif len(fields) >= 3:
+            records.append({"record": "stat_result", "stat": stat, "score": _number(fields[0]),
+                            "accuracy": _number(fields[1]), "performance": _number(fields[2])})
+        elif len(fields) == 2:
+            records.append({"record": "set", "score": _number(fields[0]), "performance": _number(fields[1])})
+        else:
+            records.append({"record": "set_count", "stat": stat, "count": _number(line)})
+        index += 1
+    if exercise is not None:
+        records.append(exercise)
+    return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert session data text files to keyed JSON Lines files.")
+    parser.add_argument("participants", nargs="*", help="participants to convert (default: all)")
+    parser.add_argument("--root", default=config.session_data_root, help="session data directory")
+    parser.add_argument("--force", action="store_true", help="convert exercises which have already been converted")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    participants = args.participants or sorted(name for name in os.listdir(args.root)
+                                               if os.path.isdir(os.path.join(args.root, name)))
+    for participant in participants:
+        count = migrate_participant(args.root, participant, args.force)
+        logging.info(participant + ": converted " + str(count) + " exercises")
@@ -29,9 +29,7 @@ EndSetEvent(Node)
     Check if the user has chosen to end the set.
 """
 import logging
-import os
 from statistics import mean, mode
-import time
 from datetime import datetime, timedelta
 
 from node import Node
@@ -39,14 +37,14 @@ from tree import NodeStatus
 from multiprocessing import Process, Queue, Pipe
 
 from API import api_classes
-from CoachingBehaviourTree import controller, config
+from CoachingBehaviourTree import controller, config, sync, output_client, screen_updates, session_data, prefetch
 from CoachingBehaviourTree.action import Action
-from CoachingBehaviourTree.behaviour_library import BehaviourLibraryFunctions, squash_behaviour_library
+from CoachingBehaviourTree.behaviour_library import BehaviourLibraryFunctions, squash_behaviour_library, \
+    MODELLING_BEHAVIOURS
 from Policy.policy import Policy
 from Policy.policy_wrapper import PolicyWrapper
 import numpy as np
 import random
-import requests
 import operator
 
 '''# Robot through Peppernet router:
@@ -253,22 +251,7 @@ class FormatAction(Node):
                     self.stat = config.end_session_stat
                     config.stat = config.end_session_stat
                 demo = None
-                if self.behaviour in [config.A_POSITIVEMODELING, config.A_NEGATIVEMODELING,
-                                      config.A_PREINSTRUCTION_POSITIVEMODELING, config.A_PREINSTRUCTION_NEGATIVEMODELING,
-                                      config.A_POSTINSTRUCTIONPOSITIVE_POSITIVE_MODELING,
-                                      config.A_POSTINSTRUCTIONPOSITIVE_NEGATIVE_MODELING,
-                                      config.A_POSTINSTRUCTIONNEGATIVE_POSITIVEMODELING,
-                                      config.A_POSTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                      config.A_QUESTIONING_NEGATIVEMODELING,
-                                      config.A_POSITIVEMODELING_POSTINSTRUCTIONPOSITIVE,
-                                      config.A_NEGATIVEMODELING_POSTINSTRUCTIONNEGATIVE,
-                                      config.A_POSITIVEMODELING_PREINSTRUCTION, config.A_SCOLD_POSITIVEMODELING,
-                                      config.A_CONCURRENTINSTRUCTIONPOSITIVE_POSITIVEMODELING,
-                                      config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                      config.A_MANUALMANIPULATION_POSITIVEMODELING, config.A_QUESTIONING_POSITIVEMODELING,
-                                      config.A_POSITIVEMODELING_CONCURRENTINSTRUCTIONPOSITIVE,
-                                      config.A_POSITIVEMODELING_QUESTIONING, config.A_POSITIVEMODELING_HUSTLE,
-                                      config.A_POSITIVEMODELING_PRAISE]:
+                if self.behaviour in MODELLING_BEHAVIOURS:
                     if ((self.goal_level == config.EXERCISE_GOAL and self.behaviour in [config.A_PREINSTRUCTION,
                                                                                         config.A_PREINSTRUCTION_FIRSTNAME,
                                                                                         config.A_PREINSTRUCTION_POSITIVEMODELING,
@@ -276,10 +259,10 @@ class FormatAction(Node):
                                                                                         config.A_PREINSTRUCTION_QUESTIONING,
                                                                                         config.A_PREINSTRUCTION_PRAISE,
                                                                                         config.A_PREINSTRUCTION_NEGATIVEMODELING]) or self.goal_level == config.STAT_GOAL) and self.phase == config.PHASE_START:
-                        demo = self.behaviour_lib.get_demo_string(self.behaviour, self.goal_level, config.shot, config.hand, config.stat, config.leftHand, config.score, config.target)
+                        demo = prefetch.get_demo_string(self.behaviour_lib, self.behaviour, self.goal_level, config.shot, config.hand, config.stat, config.leftHand, config.score, config.target)
                     else:
-                        demo = self.behaviour_lib.get_demo_string(self.behaviour, self.goal_level, config.shot,
-                                                                  config.hand, config.stat, config.leftHand, self.score, self.target)
+                        demo = prefetch.get_demo_string(self.behaviour_lib, self.behaviour, self.goal_level, config.shot,
+                                                        config.hand, config.stat, config.leftHand, self.score, self.target)
                     logging.info("Demo = " + str(demo))
                 question = None
                 if self.behaviour in [config.A_QUESTIONING, config.A_QUESTIONING_FIRSTNAME,
@@ -314,7 +297,7 @@ class FormatAction(Node):
                                       config.A_PREINSTRUCTION_MANUALMANIPULATION,
                                       config.A_PREINSTRUCTION_FIRSTNAME,
                                       config.A_MANUALMANIPULATION_PREINSTRUCTION] and self.goal_level == config.SET_GOAL:
-                    r = requests.post(config.screen_post_address + "0/newRep")
+                    screen_updates.set_rep_count(0)
                 if self.performance is None:
                     self.performance = -1
                 if self.behaviour is not None:
@@ -323,14 +306,14 @@ class FormatAction(Node):
                                                       config.A_PREINSTRUCTION_QUESTIONING, config.A_PREINSTRUCTION_PRAISE,
                                                       config.A_PREINSTRUCTION_NEGATIVEMODELING]) or self.goal_level == config.STAT_GOAL) and self.phase == config.PHASE_START:
                         logging.debug("Using config scores to generate utterance. goal_level = " + str(self.goal_level) + ", behaviour = " + str(self.behaviour) + ", phase = " + str(self.phase) + ", score = " + str(config.score) + ", target = " + str(config.target))
-                        pre_msg = self.behaviour_lib.get_pre_msg(self.behaviour, self.goal_level, self.performance,
-                                                                 self.phase, self.name, config.shot, config.hand,
-                                                                 config.stat,
-                                                                 config.shot_count == 3 and config.set_count == config.SETS_PER_STAT,
-                                                                 not config.set_count == 0 and not config.set_count == config.SETS_PER_STAT,
-                                                                 config.score, config.target)
+                        pre_msg = prefetch.get_pre_msg(self.behaviour_lib, self.behaviour, self.goal_level,
+                                                       self.performance, self.phase, self.name, config.shot,
+                                                       config.hand, config.stat,
+                                                       config.shot_count == 3 and config.set_count == config.SETS_PER_STAT,
+                                                       not config.set_count == 0 and not config.set_count == config.SETS_PER_STAT,
+                                                       config.score, config.target)
                     else:
-                        pre_msg = self.behaviour_lib.get_pre_msg(self.behaviour, self.goal_level, self.performance, self.phase, self.name, config.shot, config.hand, config.stat, config.shot_count == 3 and config.set_count == config.SETS_PER_STAT, not config.set_count == 0 and not config.set_count == config.SETS_PER_STAT, self.score, self.target)
+                        pre_msg = prefetch.get_pre_msg(self.behaviour_lib, self.behaviour, self.goal_level, self.performance, self.phase, self.name, config.shot, config.hand, config.stat, config.shot_count == 3 and config.set_count == config.SETS_PER_STAT, not config.set_count == 0 and not config.set_count == config.SETS_PER_STAT, self.score, self.target)
                 else:
                     pre_msg = ""
                 if self.score is None and ((config.score is None or config.score == -1) and (self.goal_level == config.EXERCISE_GOAL or self.goal_level == config.STAT_GOAL)) or config.has_score_been_provided:  # or config.given_score >= 2:
@@ -453,7 +436,7 @@ class FormatAction(Node):
                     "silence": "True"
                 }
                 # Send post request to Pepper
-                r = requests.post(config.post_address, json=output)
+                screen_updates.refresh_silence(output)
 
                 logging.debug("Returning FAIL from FormatAction, behaviour = " + str(self.behaviour))
                 logging.debug("Returning FAIL from FormatAction, behaviour = " + str(self.behaviour))
@@ -577,6 +560,7 @@ class DisplayBehaviour(Node):
             run_cb=self.run,
             configure_cb=self.configure,
             *args, **kwargs)
+        self.utterance_id = None
 
     def configure(self, nodedata):
         """
@@ -591,17 +575,29 @@ class DisplayBehaviour(Node):
         self.set_start = nodedata.get_data('set_start', False)
         self.score = nodedata.get_data('score', None)
         self.goal_level = nodedata.get_data('goal_level')
+        self.utterance_id = None
 
     def run(self, nodedata):
         """
         Execute the specified action.
-        :return: NodeStatus.SUCCESS if action sent successfully to robot, NodeStatus.FAIL otherwise.
-        """
+        :return: NodeStatus.SUCCESS if action sent successfully to robot, NodeStatus.ACTIVE while the robot is
+            performing it, NodeStatus.FAIL otherwise.
+        """
+        if self.utterance_id is not None:
+            # Wait for the robot to acknowledge the action before continuing because the session might be paused.
+            if sync.utterance_pending(self.utterance_id):
+                sync.tree_waiting()
+                return NodeStatus(NodeStatus.ACTIVE, "Waiting for robot to finish action.")
+            return self._action_displayed()
         if not config.stop_set and not config.stop_session and not config.pause_display:
-            logging.debug(str(self.action))
-            logging.info("Displaying action {}".format(str(self.action)))
+            if sync.speaking():
+                # The robot is still saying something else, e.g. that the session is ending.
+                sync.tree_waiting()
+                return NodeStatus(NodeStatus.ACTIVE, "Waiting for robot to finish speaking.")
+            utterance = str(self.action)
+            logging.info("Displaying action {}".format(utterance))
             output = {
-                "utterance": str(self.action)
+                "utterance": utterance
             }
             if self.action.demo is not None:
                 output['demo'] = self.action.demo
@@ -619,33 +615,18 @@ class DisplayBehaviour(Node):
                 else:
                     goal_level = "stat"
                 if config.overridePreInstructionOption:
-                    utteranceURL = config.screen_post_address + str(self.action).replace(' ', '%20') + "/pre/" + goal_level + "/overrideOption"
+                    utteranceURL = config.screen_post_address + utterance.replace(' ', '%20') + "/pre/" + goal_level + "/overrideOption"
                     config.overridePreInstructionOption = False
                 else:
-                    utteranceURL = config.screen_post_address + str(self.action).replace(' ', '%20') + "/question/" + goal_level + "/overrideOption"
+                    utteranceURL = config.screen_post_address + utterance.replace(' ', '%20') + "/question/" + goal_level + "/overrideOption"
                     config.overrideQuestioningOption = False
             else:
-                utteranceURL = config.screen_post_address + str(self.action).replace(' ', '%20') + "/" + phase + "/newUtterance"
-            r = requests.post(utteranceURL)
+                utteranceURL = config.screen_post_address + utterance.replace(' ', '%20') + "/" + phase + "/newUtterance"
+            output_client.post(utteranceURL)
             # Send post request to Pepper
-            r = requests.post(config.post_address, json=output)
-
-            # Wait for response before continuing because the session might be paused.
-            while r.status_code is None:
-                time.sleep(0.2)
-
-            config.behaviour_displayed = True
-            #config.need_new_behaviour = True
-            if self.score is not None and isinstance(self.action.score, float) and not self.action.goal == config.ACTION_GOAL and config.phase == config.PHASE_END:  # and config.has_score_been_provided is False:
-                config.has_score_been_provided = True
-                config.given_stat_explanation = True
-                # config.scores_provided += 1
-                logging.debug("Setting has_score_been_provided to True")
-            if self.set_start:
-                config.expecting_action_goal = True
-                config.dont_send_action_response = False
-            logging.debug("Returning SUCCESS from DisplayBehaviour")
-            return NodeStatus(NodeStatus.SUCCESS, "logging.debuged action message to output.")
+            self.utterance_id = output_client.post_utterance(output)
+            sync.tree_waiting()
+            return NodeStatus(NodeStatus.ACTIVE, "Sent action to robot.")
         else:
             if config.pause_display:
                 config.behaviour_displayed = True
@@ -654,6 +635,25 @@ class DisplayBehaviour(Node):
                 return NodeStatus(NodeStatus.FAIL, "Stopping session on baseline")
             return NodeStatus(NodeStatus.SUCCESS, "Stop set/session display behaviour")
 
+    def _action_displayed(self):
+        """
+        Update the config once the robot has acknowledged the action.
+        :return:type NodeStatus: SUCCESS.
+        """
+        self.utterance_id = None
+        config.behaviour_displayed = True
+        #config.need_new_behaviour = True
+        if self.score is not None and isinstance(self.action.score, float) and not self.action.goal == config.ACTION_GOAL and config.phase == config.PHASE_END:  # and config.has_score_been_provided is False:
+            config.has_score_been_provided = True
+            config.given_stat_explanation = True
+            # config.scores_provided += 1
+            logging.debug("Setting has_score_been_provided to True")
+        if self.set_start:
+            config.expecting_action_goal = True
+            config.dont_send_action_response = False
+        logging.debug("Returning SUCCESS from DisplayBehaviour")
+        return NodeStatus(NodeStatus.SUCCESS, "logging.debuged action message to output.")
+
     def sendBehaviour(self, child_conn):
         child_conn.send(self.action)
         child_conn.close()
@@ -886,8 +886,8 @@ class CreateSubgoal(Node):
                         shotString = config.hand + " " + config.shot
                         # shotString = nodedata.get_data("hand") + " " + nodedata.get_data("shot")
                         utteranceURL = config.screen_post_address + shotString + "/newPicture"
-                        r = requests.post(utteranceURL)
-                        r = requests.post(config.screen_post_address + "0/newRep")
+                        output_client.post(utteranceURL)
+                        screen_updates.set_rep_count(0)
                     elif nodedata.new_goal == config.STAT_GOAL:
                         if config.stop_session_on_baseline:
                             config.finished_stat = True
@@ -1158,14 +1158,7 @@ class TimestepCue(Node):
                         if len(config.session_performance_list) > 0:
                             nodedata.performance = mode(config.session_performance_list)
                             # Write updated no. of sessions to file.
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            file_contents[0] = str(config.sessions) + "\n"
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                            session_data.get_session_store().set_session_count(config.sessions)
 
                         nodedata.phase = config.PHASE_END
                         config.completed = config.COMPLETED_STATUS_TRUE
@@ -1175,17 +1168,13 @@ class TimestepCue(Node):
                         return NodeStatus(NodeStatus.SUCCESS, "Data for stat goal obtained from guide:" + str(nodedata))
                     else:
                         # Get no. of sessions from file.
-                        try:
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-                            config.sessions = int(file_contents[0]) + 1
-                        except:
+                        store = session_data.get_session_store()
+                        sessions = store.get_session_count()
+                        if sessions is not None:
+                            config.sessions = sessions + 1
+                        else:
                             config.sessions = 1
-                            os.mkdir("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo)
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "a")
-                            f.write(str(config.sessions) + "\n")  # Write participant number and 0 sessions to the new file.
-                            f.close()
+                            store.set_session_count(config.sessions)  # Create the participant's data.
 
                         nodedata.sessions = config.sessions
                         nodedata.player_ability = config.ability
@@ -1196,6 +1185,7 @@ class TimestepCue(Node):
                         return NodeStatus(NodeStatus.SUCCESS, "Data for person goal obtained from guide:" + str(nodedata))
                 else:
                     logging.debug("Returning ACTIVE from TimestepCue player goal")
+                    sync.tree_waiting()
                     return NodeStatus(NodeStatus.ACTIVE, "Waiting for person goal data from guide.")
 
             elif self.goal_level == config.SESSION_GOAL:  # For session goal should have performance from previous session.
@@ -1207,14 +1197,8 @@ class TimestepCue(Node):
                             nodedata.performance = mode(config.session_performance_list)
                             nodedata.score = mean(config.session_score_list)  # config.score
                             # Write session performance to file.
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            file_contents.insert(1, str(nodedata.performance) + ", " + str(nodedata.score) + "\n")
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo  + "/Sessions.txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                            session_data.get_session_store().add_session_result(config.sessions, nodedata.performance,
+                                                                                nodedata.score)
 
                         nodedata.phase = config.PHASE_END
 
@@ -1231,12 +1215,9 @@ class TimestepCue(Node):
                     else:
                         if config.shot_count == 0:
                             if config.sessions > 1:  # If this is not the first session, get previous performance from file.
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt", "r")
-                                file_contents = f.readlines()
-                                f.close()
-
-                                config.performance = int(file_contents[1].split(", ")[0])
-                                config.score = float(file_contents[1].split(" ")[1])
+                                session_result = session_data.get_session_store().get_last_session_result()
+                                if session_result is not None:
+                                    config.performance, config.score = session_result
                         nodedata.performance = config.performance
                         nodedata.score = config.score
                         nodedata.phase = config.PHASE_START
@@ -1248,6 +1229,8 @@ class TimestepCue(Node):
                         logging.debug("In timestep cue session goal, setting config.goal_level to SESSION GOAL")
                         config.goal_level = config.SESSION_GOAL
                         config.phase = config.PHASE_START
+                    else:
+                        sync.tree_waiting()
                     logging.debug("Returning ACTIVE from TimestepCue session goal")
                     return NodeStatus(NodeStatus.ACTIVE, "Waiting for session goal data from guide.")
 
@@ -1260,32 +1243,8 @@ class TimestepCue(Node):
                             nodedata.phase = config.PHASE_END
                             nodedata.score = config.metric_score_list
 
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Baseline.txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            stat_list = ["racketPreparation", "approachTiming", "impactCutAngle", "impactSpeed",
-                                         "followThroughRoll", "followThroughTime"]
-                            index = 0
-                            # folder path
-                            dir_path = "/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot)
-                            fileCount = 0
-                            # Iterate directory
-                            for path in os.listdir(dir_path):
-                                # check if current path is a file
-                                if os.path.isfile(os.path.join(dir_path, path)):
-                                    fileCount += 1
-                            contentIndex = 1 + (fileCount - 2) * 12
-                            for i in range(0, nodedata.score.__len__()):
-                            # for score in nodedata.score.items():
-                                stat_name = stat_list[index]
-                                file_contents[contentIndex] = str(nodedata.score[stat_name]) + ", " + str(config.stat_list[stat_name]) + ", \n"
-                                index += 1
-                                contentIndex += 2
-
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Baseline.txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                            session_data.get_session_store().set_baseline_result(config.hand, config.shot, config.sessions,
+                                                                                 nodedata.score, config.stat_list)
 
                             logging.debug("Returning SUCCESS from TimestepCue shot goal (baseline goal end), stats = " + str(nodedata))
                             return NodeStatus(NodeStatus.SUCCESS, "Data for shot goal obtained from guide:" + str(nodedata))
@@ -1300,61 +1259,8 @@ class TimestepCue(Node):
                                 config.session_score_list.append(nodedata.score)
 
                                 # Write performance data about the exercise just completed to file.
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/Aggregator.txt", "r")
-                                aggregator_contents = f.readlines()
-                                f.close()
-                                logging.debug("File contents = " + str(aggregator_contents))
-
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/" + str(config.sessions) + ".txt", "r")
-                                this_session_contents = f.readlines()
-                                f.close()
-
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/Baseline.txt", "r")
-                                baseline_contents = f.readlines()
-                                f.close()
-
-                                this_session_contents.insert(0, str(nodedata.score) + "\n")
-                                this_session_contents.insert(1, str(nodedata.performance) + "\n")
-
-                                aggregator_contents[0] = str(nodedata.score) + "\n"
-                                if len(aggregator_contents) > 1:
-                                    aggregator_contents[1] = str(nodedata.performance) + "\n"
-                                else:
-                                    aggregator_contents.append(str(nodedata.performance) + "\n")
-
-                                this_session_line_no = 2
-                                while len(this_session_contents) > this_session_line_no:
-                                    stat = this_session_contents[this_session_line_no]
-                                    this_session_line_no += 1
-                                    if not (stat in aggregator_contents):
-                                        aggregator_contents.append(stat)
-                                        aggregator_contents.append(this_session_contents[this_session_line_no])
-                                    else:
-                                        index = aggregator_contents.index(stat)
-                                        aggregator_contents[index+1] = this_session_contents[this_session_line_no]
-
-                                    # Update baseline file
-                                    indices = [i for i, e in enumerate(baseline_contents) if e == stat]
-                                    index = indices[len(indices) - 1]  # baseline_contents.index(stat)
-                                    baseline_contents[index + 1] = this_session_contents[this_session_line_no]
-
-                                    this_session_line_no += 1
-                                    lines_to_add = int(this_session_contents[this_session_line_no]) + 1
-                                    this_session_line_no += lines_to_add
-
-                                logging.debug("File contents = " + str(aggregator_contents))
-
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/Aggregator.txt", "w")
-                                f.writelines(aggregator_contents)
-                                f.close()
-
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                                f.writelines(this_session_contents)
-                                f.close()
-
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + str(config.hand) + str(config.shot) + "/Baseline.txt", "w")
-                                f.writelines(baseline_contents)
-                                f.close()
+                                session_data.get_session_store().finish_exercise(config.hand, config.shot, config.sessions,
+                                                                                 nodedata.score, nodedata.performance)
 
                             # Clear the controller's lists for the exercise that has just happened.
                             config.shot_performance_list = []
@@ -1377,99 +1283,37 @@ class TimestepCue(Node):
                             return NodeStatus(NodeStatus.SUCCESS, "Data for shot goal obtained from guide:" + str(nodedata))
                         else:
                             logging.debug("Returning FAIL from TimestepCue shot goal, config.completed = COMPLETED_STATUS_UNDEFINED")
+                            sync.tree_waiting()
                             return NodeStatus(NodeStatus.FAIL, "Waiting for shot goal data from guide.")  # return FAIL to reset config variables.
                     else:
                         if config.stat_count == 0:  # Not already worked on this shot during this session.
                             # Get performance data of previous time user did this exercise from file.
-                            try:
-                                logging.debug("Trying to open aggregator")
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Aggregator.txt", "r")
-                                logging.debug("Opened aggregator")
-                                file_contents = f.readlines()
-                                f.close()
-                                config.performance = int(file_contents[1].replace("\n", ""))
+                            store = session_data.get_session_store()
+                            exercise_result = store.get_exercise_result(config.hand, config.shot)
+                            if exercise_result is not None:
+                                config.score, config.performance = exercise_result
                                 nodedata.performance = config.performance
-                                config.score = float(file_contents[0].replace("\n", ""))
                                 nodedata.score = config.score
 
-                                try:
-                                    logging.debug("Trying to open baseline")
-                                    # Create sorted stat list. Stat with the lowest score will come first. If this shot hasn't
-                                    # been performed before, this will be done at the end of the baseline goal.
-                                    f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Baseline.txt", "r")
-                                    logging.debug("Opened baseline")
-                                    file_contents = f.readlines()
-                                    f.close()
-                                    logging.debug("Closed file")
-                                    stat_acc_set = {}
-                                    stat_score_set = {}
-                                    stat_perf_set = {}
-                                    max = len(file_contents)
-                                    # folder path
-                                    dir_path = "/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(
-                                        config.shot)
-                                    fileCount = 0
-                                    # Iterate directory
-                                    for path in os.listdir(dir_path):
-                                        # check if current path is a file
-                                        if os.path.isfile(os.path.join(dir_path, path)):
-                                            fileCount += 1
-                                    index = (fileCount - 3) * 12
-                                    # index = (config.sessions - 1) * 12
-                                    while index < max:
-                                        stat_name = file_contents[index].replace("\n", "")
-                                        logging.debug("stat_name = " + stat_name)
-                                        stat_acc_set[stat_name] = float(file_contents[index+1].split(", ")[1].replace("\n", "").replace(",", "").replace(" ", ""))
-                                        logging.debug("stat_acc_set found")
-                                        logging.debug("stat_acc_set = " + str(stat_acc_set))
-                                        stat_score_set[stat_name] = float(file_contents[index+1].split(", ")[0].replace("\n", "").replace(",", "").replace(" ", ""))
-                                        logging.debug("stat_score_set found")
-                                        logging.debug("stat_score_set = " + str(stat_score_set))
-
-                                        index += 2
-
-                                    index = len(file_contents) - 1
-                                    while index >= 1:
-                                        stat_name = file_contents[index - 1].replace("\n", "")
-                                        try:
-                                            logging.debug("already got performance for " + stat_name + ": " + str(stat_perf_set[stat_name]))
-                                        except KeyError as error:
-                                            logging.debug("file_contents.split = " + str(file_contents[index].split(", ")))
-                                            split = file_contents[index].split(", ")
-                                            if len(split) > 2 and split[2] != "\n":
-                                                stat_perf_set[stat_name] = int(
-                                                    split[2].replace("\n", "").replace(",", "").replace(" ", ""))
-                                            else:
-                                                stat_perf_set[stat_name] = None
-                                            logging.debug("stat_perf_set found")
-                                            logging.debug("stat_perf_set = " + str(stat_perf_set))
-
-                                        index -= 2
-
-                                    #sorted_stat_set = sorted(stat_set.items(), key=operator.itemgetter(1))
-                                    #sorted_stat_list = []
-                                    #for i in sorted_stat_set:
-                                    #    sorted_stat_list.append(i[0])
-                                    #sorted_stat_list.reverse()  # Reverse to get most important shot first.
-
+                                # Create sorted stat list. Stat with the lowest score will come first. If this shot hasn't
+                                # been performed before, this will be done at the end of the baseline goal.
+                                baseline = store.get_baseline(config.hand, config.shot)
+                                if baseline is not None:
+                                    stat_acc_set, stat_score_set, stat_perf_set = baseline
                                     config.stat_list = stat_acc_set
                                     config.metric_score_list = stat_acc_set
                                     config.metric_performance_list = stat_perf_set
                                     logging.debug("Config.stat_list = " + str(config.stat_list))
                                     logging.debug("Config.metric_score_list = " + str(config.metric_score_list))
                                     logging.debug("Config.metric_performance_list = " + str(config.metric_performance_list))
-                                except:
+                                else:
                                     logging.debug("Aggregator text file found but baseline text file not found, in start of exercise goal.")
 
-                            except:  # If file doesn't exist, create it.
+                            else:  # If file doesn't exist, create it.
                                 logging.debug(config.participantNo)
                                 logging.debug(config.hand)
                                 logging.debug(config.shot)
-                                os.mkdir("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot))
-                                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Aggregator.txt", "a")
-                                file_contents = "0"
-                                f.write(file_contents)
-                                f.close()
+                                store.create_exercise(config.hand, config.shot)
                                 config.performance = None
                                 # config.score = None
 
@@ -1489,6 +1333,8 @@ class TimestepCue(Node):
                     if config.stat_count > 0 and not config.tidying and not config.tidied_up:
                         config.goal_level = config.EXERCISE_GOAL
                         config.phase = config.PHASE_START
+                    else:
+                        sync.tree_waiting()
                     logging.debug("Returning FAIL from TimestepCue exercise goal, config.goal_level != 2")
                     return NodeStatus(NodeStatus.FAIL, "Waiting for exercise goal data from guide.")  # returning FAIL so it configures again.
 
@@ -1502,24 +1348,9 @@ class TimestepCue(Node):
                             nodedata.score = config.score
                             nodedata.target = config.target
 
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            logging.debug("file contents of session_no.txt = " + str(file_contents))
-                            stat_name = str(config.stat) + "\n"
-                            # Find last occurence of stat_name in file_contents:
-                            index = 0
-                            for i in range(0, len(file_contents)):
-                                if file_contents[i] == stat_name:
-                                    index = i
-
-                            # index = file_contents.index(stat_name)
-                            file_contents.insert(index+1, str(nodedata.score) + ", " + str(config.accuracy) + ", " + str(nodedata.performance) + ", \n")
-
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                            session_data.get_session_store().set_stat_result(config.hand, config.shot, config.sessions,
+                                                                             config.stat, nodedata.score, config.accuracy,
+                                                                             nodedata.performance)
 
                             config.shot_performance_list.append(nodedata.performance)
                             config.shot_score_list.append(nodedata.score)
@@ -1535,44 +1366,21 @@ class TimestepCue(Node):
                         return NodeStatus(NodeStatus.SUCCESS, "Data for stat goal obtained from guide:" + str(nodedata))
                     else:
                         # Get performance data of previous time user did this stat for this exercise from file.
-                        stat_name = None
+                        store = session_data.get_session_store()
                         try:
                             logging.debug("Getting last time's data from file.")
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Aggregator.txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            stat_name = str(config.stat) + "\n"
-                            if stat_name in file_contents:
-                                index = 0
-                                for i in range(0, len(file_contents)):
-                                    if file_contents[i] == stat_name:
-                                        index = i
-                                # index = file_contents.index(stat_name)
-                                split = file_contents[index+1].split(", ")
-                                config.score = float(split[0])
-                                config.performance = int(split[2].replace("\n", "").replace(",", "").replace(" ", ""))
+                            stat_result = store.get_stat_result(config.hand, config.shot, config.stat)
+                            if stat_result is not None:
+                                config.score, config.performance = stat_result
                                 logging.debug("Stat in file. score = " + str(config.score) + ", performance = " + str(config.performance))
                             else:
-                                logging.debug("Stat not in file: " + stat_name)
+                                logging.debug("Stat not in file: " + str(config.stat))
                                 config.performance = None
                                 # config.score = None
                         except:
                             logging.debug("File error")
 
-                        try:
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-                        except:
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "a")
-                            file_contents = []
-                            f.close()
-
-                        file_contents.append(stat_name)
-                        f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                        f.writelines(file_contents)
-                        f.close()
+                        store.start_stat(config.hand, config.shot, config.sessions, config.stat)
 
                         config.completed = config.COMPLETED_STATUS_FALSE
                         nodedata.performance = config.performance
@@ -1581,6 +1389,7 @@ class TimestepCue(Node):
                         return NodeStatus(NodeStatus.SUCCESS, "Data for stat goal obtained from guide:" + str(nodedata))
                 else:
                     logging.debug("Returning ACTIVE from TimestepCue stat goal")
+                    sync.tree_waiting()
                     return NodeStatus(NodeStatus.ACTIVE, "Waiting for stat goal data from guide.")
 
             elif self.goal_level == config.SET_GOAL:
@@ -1602,14 +1411,8 @@ class TimestepCue(Node):
                             config.stat_score_list.append(nodedata.score)
 
                             # Write to file
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "r")
-                            file_contents = f.readlines()
-                            f.close()
-
-                            file_contents.append(str(nodedata.score) + ", " + str(nodedata.performance) + ", \n")
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                            session_data.get_session_store().add_set_result(config.hand, config.shot, config.sessions,
+                                                                            nodedata.score, nodedata.performance)
 
                         # Clear the controller's lists for the set that has just happened.
                         config.set_performance_list = []
@@ -1627,28 +1430,10 @@ class TimestepCue(Node):
                         logging.debug("Set goal phase start")
                         nodedata.phase = config.PHASE_START
 
-                        f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "r")
-                        file_contents = f.readlines()
-                        f.close()
-                        stat_name = str(config.stat) + "\n"
-
                         if len(config.stat_performance_list) > 0:
                             logging.debug("Stat_performance_list not empty")
                             nodedata.performance = config.stat_performance_list[len(config.set_performance_list) - 1]  # Get last entry of stat performance list.
                             nodedata.score = config.stat_score_list[len(config.stat_score_list) - 1]
-
-                            index = 0
-                            for i in range(0, len(file_contents)):
-                                if file_contents[i] == stat_name:
-                                    index = i
-                            # index = file_contents.index(stat_name)
-                            if len(file_contents) > index:
-                                file_contents[index+1] = str(config.set_count + 1) + "\n"
-                            else:
-                                file_contents.append(str(config.set_count + 1) + "\n")
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
                         else:
                             logging.debug("stat_performance_list empty")
                             # nodedata.performance = None
@@ -1656,10 +1441,8 @@ class TimestepCue(Node):
                             nodedata.score = config.score
                             logging.debug("set nodedata.score = " + str(nodedata.score))
 
-                            file_contents.append(str(config.set_count + 1) + "\n")
-                            f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/" + str(config.sessions) + ".txt", "w")
-                            f.writelines(file_contents)
-                            f.close()
+                        session_data.get_session_store().set_set_count(config.hand, config.shot, config.sessions,
+                                                                       config.stat, config.set_count + 1)
 
                         nodedata.target = config.target
                         config.shot_count = 0
@@ -1674,6 +1457,7 @@ class TimestepCue(Node):
                         config.completed = config.COMPLETED_STATUS_FALSE
                     logging.debug("Returning ACTIVE from TimestepCue set goal")
                     logging.debug("Returning ACTIVE from TimestepCue set goal")
+                    sync.tree_waiting()
                     return NodeStatus(NodeStatus.ACTIVE, "Waiting for set goal data from guide.")
 
             elif self.goal_level == config.ACTION_GOAL and not config.stop_session:
@@ -1693,6 +1477,7 @@ class TimestepCue(Node):
                     # config.goal_level = config.ACTION_GOAL
                     logging.debug("Returning ACTIVE from TimestepCue action goal")
                     logging.debug("Returning ACTIVE from TimestepCue action goal")
+                    sync.tree_waiting()
                     return NodeStatus(NodeStatus.ACTIVE, "Waiting for action goal input from operator.")
 
             elif self.goal_level == config.BASELINE_GOAL:
@@ -1702,21 +1487,7 @@ class TimestepCue(Node):
                     config.completed = config.COMPLETED_STATUS_FALSE
 
                     # Create file for baseline goal.
-                    f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Baseline.txt", "a")
-                    file_contents = ["racketPreparation\n",
-                                     "0\n",
-                                     "approachTiming\n",
-                                     "0\n",
-                                     "impactCutAngle\n",
-                                     "0\n",
-                                     "impactSpeed\n",
-                                     "0\n",
-                                     "followThroughRoll\n",
-                                     "0\n",
-                                     "followThroughTime\n",
-                                     "0\n"]
-                    f.writelines(file_contents)
-                    f.close()
+                    session_data.get_session_store().start_baseline(config.hand, config.shot, config.sessions)
                     logging.debug("Returning SUCCESS from TimestepCue baseline goal, stats = " + str(nodedata))
                     return NodeStatus(NodeStatus.SUCCESS, "Data for baseline goal obtained from guide:" + str(nodedata))
                 else:
@@ -1805,13 +1576,10 @@ class DurationCheck(Node):
                     phase = "non-exercise"
 
                     utteranceURL = config.screen_post_address + utterance + "/" + phase + "/end/newUtterance"
-                    r = requests.post(utteranceURL)
-                    # Send post request to Pepper
-                    r = requests.post(config.post_address, json=output)
-
-                    # Wait for response before continuing because the session might be paused.
-                    while r.status_code is None:
-                        time.sleep(0.2)
+                    output_client.post(utteranceURL)
+                    # Send post request to Pepper. DisplayBehaviour waits for the robot to finish saying this before
+                    # displaying anything else.
+                    output_client.post_utterance(output)
 
                     config.session_stop_utterance_given = True
 
@@ -1910,6 +1678,7 @@ class GetChoice(Node):
                     config.hand = nodedata.hand
 
                     logging.info("System has chosen a new shot: Hand = " + str(config.hand) + ", shot = " + str(config.shot))
+                    prefetch.prefetch_demos(config.shot, config.hand, None)
 
                     logging.debug("Returning SUCCESS from GetUserChoice, shot = " + str(nodedata.hand) + " " + str(nodedata.shot))
                     return NodeStatus(NodeStatus.SUCCESS,"Returning SUCCESS from GetUserChoice, shot = " + str(nodedata.hand) + " " + str(nodedata.shot))
@@ -1936,6 +1705,7 @@ class GetChoice(Node):
                     else:
                         config.performance = None
                     logging.info("System has chosen a new swing metric: " + str(config.stat))
+                    prefetch.prefetch_demos(config.shot, config.hand, config.stat)
                     config.set_count = 0  # Reset the set count for this session to 0.
                     logging.debug("Returning SUCCESS from GetUserChoice, stat = " + str(nodedata.stat))
                     return NodeStatus(NodeStatus.SUCCESS,"Returning SUCCESS from GetUserChoice, stat = " + str(nodedata.stat))
@@ -1943,6 +1713,7 @@ class GetChoice(Node):
                 if self.choice_type == config.SHOT_CHOICE:
                     if config.shot is None:
                         logging.debug("Returning ACTIVE form user's choice")
+                        sync.tree_waiting()
                         return NodeStatus(NodeStatus.ACTIVE, "Waiting on user's shot choice")
 
                     nodedata.shot = config.shot
@@ -1951,11 +1722,13 @@ class GetChoice(Node):
                     #config.performance = None
                     #config.score = -1
                     logging.info("Player has chosen a new shot: Hand = " + str(config.hand) + ", shot = " + str(config.shot))
+                    prefetch.prefetch_demos(config.shot, config.hand, None)
                     logging.debug("Returning SUCCESS from GetUserChoice, shot = " + str(nodedata.hand) + " " + str(nodedata.shot))
                     logging.debug("Returning SUCCESS from GetUserChoice, shot = " + str(nodedata.hand) + " " + str(nodedata.shot))
                     return NodeStatus(NodeStatus.SUCCESS, "Returning SUCCESS from GetUserChoice, shot = " + str(nodedata.hand) + " " + str(nodedata.shot))
                 else:  # STAT_CHOICE
                     if config.stat is None:
+                        sync.tree_waiting()
                         return NodeStatus(NodeStatus.ACTIVE, "Waiting on user's stat choice")
 
                     nodedata.stat = config.stat
@@ -1970,6 +1743,7 @@ class GetChoice(Node):
                     else:
                         config.performance = None
                     logging.info("Person has chosen a new swing metric: " + str(config.stat))
+                    prefetch.prefetch_demos(config.shot, config.hand, config.stat)
                     #config.performance = None
                     #config.score = -1
                     logging.debug("Returning SUCCESS from GetUserChoice, stat = " + str(nodedata.stat))
@@ -2040,7 +1814,7 @@ class EndSetEvent(Node):
                     "stop": str(1)
                 }
                 # logging.info("Stopping set.")
-                r = requests.post(config.post_address, json=output)
+                output_client.post(config.post_address, json=output)
 
                 logging.info("Shot set completed.")
                 logging.debug("Returning SUCCESS from EndSetEvent, shot count = " + str(self.shotcount) + "stat_list not empty")
@@ -2062,7 +1836,7 @@ class EndSetEvent(Node):
                 "stop": str(1)
             }
             # logging.info("Stopping set: That's 30, you can stop there.")
-            r = requests.post(config.post_address, json=output)
+            output_client.post(config.post_address, json=output)
 
             logging.info("Shot set completed.")
             logging.debug("Returning SUCCESS from EndSetEvent, shot count = " + str(self.shotcount))
@@ -2152,6 +1926,7 @@ class InitialiseBlackboard(Node):
         nodedata.performance = -1
         nodedata.phase = config.PHASE_START
         nodedata.bl = BehaviourLibraryFunctions("SquashDict", squash_behaviour_library)
+        config.behaviour_lib = nodedata.bl
         nodedata.start_time = datetime.now()  # TODO: update with actual time.
 
         # Create file for this participant if it is their first session.
@@ -2165,14 +1940,13 @@ class InitialiseBlackboard(Node):
 
         # Populate the sorted_shot_list with data stored in file from previous sessions.
         shot_set = {}
+        # Load everything about the participant needed during the session, so later nodes read it from memory.
+        store = session_data.get_session_store()
+        store.load(["FH", "BH"], list(config.shot_list_master))
         for shot in config.shot_list_master:
             for hand in ["FH", "BH"]:
                 try:
-                    f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + hand + shot + "/Aggregator.txt", "r")
-                    aggregator_contents = f.readlines()
-                    f.close()
-
-                    score = float(aggregator_contents[0])
+                    score = store.get_exercise_result(hand, shot)[0]
                 except:
                     score = 2.5
                 # Assign a score to each shot based on the importance of the shot (taken from racketware) and data
@@ -2268,6 +2042,7 @@ class OverrideOption(Node):
         if (not config.stop_set and not config.stop_session):  # or config.overriden:
             if config.override is None:
                 logging.debug("Returning ACTIVE from OverrideOption, Waiting for user to decide whether to override.")
+                sync.tree_waiting()
                 return NodeStatus(NodeStatus.ACTIVE, "Waiting for user to decide whether to override.")
             else:
                 if config.override:
@@ -2332,54 +2107,16 @@ class CheckDoneBefore(Node):
         # return NodeStatus(NodeStatus.FAIL)
 
         if not config.stop_set and not config.stop_session:
-            try:
-                f = open("/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(config.shot) + "/Baseline.txt", "r")
-                f_contents = f.readlines()
-                f.close()
-
-                if config.stat_count > 0:
-                    logging.debug("Returning SUCCESS from CheckDoneBefore, Found file containing this exercise and stat_count > 0")
-                    return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
-                else:
-                    # folder path
-                    dir_path = "/home/martin/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/" + config.hand + str(
-                        config.shot)
-                    fileCount = 0
-                    # Iterate directory
-                    for path in os.listdir(dir_path):
-                        # check if current path is a file
-                        if os.path.isfile(os.path.join(dir_path, path)):
-                            fileCount += 1
-                    required_length = 1 + (fileCount - 2) * 12
-                    logging.debug("Checking done before.")
-                    logging.debug("required_length = " + str(required_length) + ", len(f_contents) = " + str(
-                        len(f_contents)))  # + ", f_contents[required_length = " + f_contents[required_length])
-
-                    if len(f_contents) >= required_length and f_contents[required_length] != "0\n":
-                        logging.debug("Returning SUCCESS from CheckDoneBefore")
-                        return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
-                    else:
-                        logging.debug("Returning FAIL from CheckDoneBefore: found file but not long enough")
-                        return NodeStatus(NodeStatus.FAIL, "Failed to find file containing this exercise.")
-                '''if len(f_contents) >= required_length:
-                    if config.stat_count > 0:
-                        if f_contents[required_length - 11] != "0\n":
-                            logging.debug("Returning SUCCESS from CheckDoneBefore")
-                            return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
-                        else:
-                            return NodeStatus(NodeStatus.FAIL, "Dunno")
-                    else:
-
-                else:
-                    logging.debug("Returning FAIL from CheckDoneBefore: found file but not long enough")
-                    return NodeStatus(NodeStatus.FAIL, "Failed to find file containing this exercise.")'''
-            except:
-                if config.stat_count > 0:  # If we've already worked on it today, the file won't be there yet but we don't need to do baseline goal.
-                    logging.debug("Returning SUCCESS from CheckDoneBefore, more than one stat worked on today.")
-                    return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
-                else:
-                    logging.debug("Returning FAIL from CheckDoneBefore: could not find file")
-                    return NodeStatus(NodeStatus.FAIL, "Failed to find file containing this exercise.")
+            if config.stat_count > 0:  # If we've already worked on it today we don't need to do baseline goal.
+                logging.debug("Returning SUCCESS from CheckDoneBefore, stat_count > 0")
+                return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
+            logging.debug("Checking done before.")
+            if session_data.get_session_store().baseline_done(config.hand, config.shot, config.sessions):
+                logging.debug("Returning SUCCESS from CheckDoneBefore")
+                return NodeStatus(NodeStatus.SUCCESS, "Found file containing this exercise.")
+            else:
+                logging.debug("Returning FAIL from CheckDoneBefore: baseline not done")
+                return NodeStatus(NodeStatus.FAIL, "Failed to find file containing this exercise.")
         else:
             return NodeStatus(NodeStatus.FAIL, "Stop set/session override option")
 
@@ -2546,7 +2283,7 @@ class OperatorInput(Node):
         nodedata.score = rep_time_delta
         config.exercise_count += 1
         # Send exercise count to Pepper's tablet screen
-        r = requests.post(config.screen_post_address + str(config.exercise_count) + "/newRep")
+        screen_updates.set_rep_count(config.exercise_count)
 
         # Controller start_time will be reset when the action goal is created.
 
@@ -0,0 +1,126 @@
+"""Output Client
+
+Shared HTTP client for everything the system sends to the robot (config.post_address) and its tablet screen
+(config.screen_post_address). A single requests.Session is kept for the whole session so that connections to each
+address are pooled and kept alive, rather than setting up a new TCP connection for every post.
+
+Posts are sent by a background worker per destination, so the robot and the screen are posted to concurrently and the
+caller only blocks if it needs the response. Posts to the same destination are sent one at a time, in the order they
+were made, so e.g. rep counter updates can't overtake each other. Failed connections are retried
+config.http_retries times; a post that still fails is logged and resolves to None rather than raising in the
+behaviour tree or API.
+...
+Methods
+-------
+post(url, json)
+    Queue a post request and return a Future for its response.
+post_and_wait(url, json)
+    Send a post request and block until its response is received.
+post_utterance(output)
+    Queue an utterance for the robot, tagged with the id the robot acknowledges it with.
+close(wait)
+    Stop the background workers and close the pooled connections.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from CoachingBehaviourTree import config, sync, screen_updates
+
+_lock = threading.Lock()
+_session = None
+_workers = {}
+
+
+def post(url, json=None):
+    """
+    Queue a post request to be sent by the background worker for its destination.
+    :param url :type str: the address to post to.
+    :param json :type dict: data to send as the JSON body of the request, or None.
+    :return:type concurrent.futures.Future: resolves to the requests.Response, or None if the request failed.
+    """
+    return _get_worker(url).submit(_send, url, json)
+
+
+def post_and_wait(url, json=None):
+    """
+    Send a post request and block until its response is received (or the request fails).
+    :param url :type str: the address to post to.
+    :param json :type dict: data to send as the JSON body of the request, or None.
+    :return:type requests.Response: the response, or None if the request failed.
+    """
+    return post(url, json).result()
+
+
+def post_utterance(output):
+    """
+    Queue an utterance for the robot at config.post_address. The utterance is given an id (see sync.utterance_started())
+    which the robot acknowledges when it has finished speaking. If the robot doesn't send acknowledgements, the
+    utterance is acknowledged when the robot responds to the post; if the post fails it is acknowledged straight away
+    so the tree doesn't wait for speech which will never happen. Pending screen updates are sent first.
+    :param output :type dict: the utterance data to send, to which "utterance_id" is added.
+    :return:type int: the id of the utterance.
+    """
+    # Any silence refresh still held by screen_updates must reach the robot before the utterance, not after it.
+    screen_updates.flush()
+    utterance_id = sync.utterance_started()
+    output["utterance_id"] = utterance_id
+
+    def response_received(response):
+        if response.result() is None or not config.robot_sends_utterance_acks:
+            sync.utterance_finished(utterance_id)
+
+    post(config.post_address, output).add_done_callback(response_received)
+    return utterance_id
+
+
+def close(wait=True):
+    """
+    Stop the background workers and close the pooled connections. Posts made after this start a new session.
+    :param wait :type bool: if True, send everything which has already been queued before returning.
+    """
+    global _session
+    with _lock:
+        workers = list(_workers.values())
+        _workers.clear()
+        session = _session
+        _session = None
+    for worker in workers:
+        worker.shutdown(wait=wait)
+    if session is not None:
+        session.close()
+
+
+def _get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(total=config.http_retries, connect=config.http_retries, read=0, status=0,
+                          backoff_factor=config.http_retry_backoff)
+            adapter = HTTPAdapter(pool_connections=config.http_pool_size, pool_maxsize=config.http_pool_size,
+                                  max_retries=retry)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _get_worker(url):
+    destination = urlsplit(url).netloc
+    with _lock:
+        if destination not in _workers:
+            _workers[destination] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="output-" + destination)
+        return _workers[destination]
+
+
+def _send(url, json):
+    try:
+        return _get_session().post(url, json=json, timeout=(config.http_connect_timeout, config.http_read_timeout))
+    except requests.RequestException as e:
+        logging.warning("Post to " + url + " failed: " + str(e))
+        return None
@@ -0,0 +1,48 @@
+import time
+
+
+class StepPacer:
+    """
+    Paces the controller's policy steps. The controller steps again as soon as the tree asks for a new behaviour, unless
+    a minimum spacing between steps has been configured for the current goal level, in which case it only waits for
+    whatever is left of that spacing since the previous step finished.
+    ...
+    Attributes
+    ----------
+    min_spacing :type dict[int, float]
+        Minimum number of seconds between the end of one step and the start of the next, keyed by goal level. Goal
+        levels which aren't included have no minimum.
+    last_step_time :type float
+        time.monotonic() at the end of the previous step, or None before the first step.
+
+    Methods
+    -------
+    step_finished()
+        Record the time at which a step finished.
+    wait(goal_level)
+        Block for the remainder of the minimum spacing for the given goal level, if there is one.
+    """
+    def __init__(self, min_spacing=None):
+        self.min_spacing = {} if min_spacing is None else min_spacing
+        self.last_step_time = None
+
+    def step_finished(self):
+        """
+        Record the time at which a step finished.
+        """
+        self.last_step_time = time.monotonic()
+
+    def wait(self, goal_level):
+        """
+        Block for the remainder of the minimum spacing for the given goal level, if there is one.
+        :param goal_level :type int: the goal level the next step will be taken at.
+        :return:type float: the number of seconds waited.
+        """
+        spacing = self.min_spacing.get(goal_level)
+        if not spacing or self.last_step_time is None:
+            return 0.0
+        remaining = spacing - (time.monotonic() - self.last_step_time)
+        if remaining <= 0:
+            return 0.0
+        time.sleep(remaining)
+        return remaining
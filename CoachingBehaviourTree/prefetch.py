@@ -0,0 +1,149 @@
+"""Prefetch
+
+Speculative preparation of the robot's feedback at the end of a set. While a set is played the robot is mostly silent,
+and the feedback behaviour is only chosen, and its utterance built, once the guide app posts the result of the set.
+When the result arrives, speculate() finds the behaviours the policy is most likely to choose for the feedback (from
+the policy's row for the state it will generate the behaviour from) and prepares their pre utterances and demos on a
+background thread while the behaviour tree catches up. FormatAction then uses the prepared utterance and demo of the
+behaviour actually chosen, as long as everything they were built from still matches, rather than building them itself.
+
+Demo videos are loaded by the robot the first time they are shown. When a shot or stat is chosen, prefetch_demos() tells
+the robot which demos could be shown while coaching it, so it can load them before they are needed.
+...
+Methods
+-------
+speculate(goal_level, performance, phase, score, target)
+    Prepare the utterances of the behaviours the policy is most likely to choose next.
+get_pre_msg(behaviour_lib, behaviour, goal_level, performance, phase, name, shot, hand, stat, final_set, second_set,
+            score, target)
+    Get a pre utterance from the behaviour library, using a prepared one if there is one.
+get_demo_string(behaviour_lib, behaviour, goal_level, shot, hand, stat, left_hand, score, target)
+    Get a demo from the behaviour library, using a prepared one if there is one.
+prefetch_demos(shot, hand, stat)
+    Tell the robot which demos the upcoming shot or stat could need.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from CoachingBehaviourTree import config, output_client
+from CoachingBehaviourTree.behaviour_library import MODELLING_BEHAVIOURS, get_demo_assets
+
+_lock = threading.Lock()
+_worker = None
+_job = None
+_prepared_msgs = {}
+_prepared_demos = {}
+_sent_demos = None
+
+
+def speculate(goal_level, performance, phase, score, target):
+    """
+    Prepare the pre utterances and demos of the config.prefetch_behaviours behaviours the policy is most likely to
+    choose next, on a background thread. Anything prepared by an earlier call is discarded.
+    :param goal_level :type int: the goal level the next behaviour will be chosen for.
+    :param performance :type int: the performance the next behaviour will be chosen for.
+    :param phase :type int: the phase the next behaviour will be chosen for.
+    :param score :type float: the score the utterances will be given.
+    :param target :type float: the target the utterances will be given.
+    """
+    global _worker, _job
+    behaviour_lib = config.behaviour_lib
+    if config.prefetch_behaviours <= 0 or behaviour_lib is None or config.policy_matrix is None \
+            or config.policy_state is None:
+        return
+    # Take everything the utterances are built from now, while it matches what the API has just received.
+    inputs = {"policy": config.policy_matrix, "state": config.policy_state, "behaviour": config.behaviour,
+              "name": config.name, "shot": config.shot, "hand": config.hand, "stat": config.stat,
+              "left_hand": config.leftHand,
+              "final_set": config.shot_count == 3 and config.set_count == config.SETS_PER_STAT,
+              "second_set": not config.set_count == 0 and not config.set_count == config.SETS_PER_STAT}
+    with _lock:
+        _prepared_msgs.clear()
+        _prepared_demos.clear()
+        if _worker is None:
+            _worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        _job = _worker.submit(_prepare, behaviour_lib, goal_level, performance, phase, score, target, inputs)
+
+
+def get_pre_msg(behaviour_lib, behaviour, goal_level, performance, phase, name, shot, hand, stat, final_set,
+                second_set, score, target):
+    """
+    Get a pre utterance from the behaviour library (see BehaviourLibraryFunctions.get_pre_msg()), using the one
+    prepared by speculate() if it was prepared from the same parameters.
+    :return:type str: the pre utterance.
+    """
+    args = (behaviour, goal_level, performance, phase, name, shot, hand, stat, final_set, second_set, score, target)
+    _wait_for_job()
+    with _lock:
+        prepared = _prepared_msgs.pop((id(behaviour_lib),) + args, None)
+    if prepared is not None:
+        logging.debug("Using prepared pre utterance for behaviour " + str(behaviour))
+    return behaviour_lib.get_pre_msg(*args, prepared=prepared)
+
+
+def get_demo_string(behaviour_lib, behaviour, goal_level, shot, hand, stat, left_hand, score, target):
+    """
+    Get a demo from the behaviour library (see BehaviourLibraryFunctions.get_demo_string()), using the one prepared by
+    speculate() if it was prepared from the same parameters.
+    :return:type str: the demo name, or None if there is no demo.
+    """
+    args = (behaviour, goal_level, shot, hand, stat, left_hand, score, target)
+    _wait_for_job()
+    with _lock:
+        key = (id(behaviour_lib),) + args
+        if key in _prepared_demos:
+            logging.debug("Using prepared demo for behaviour " + str(behaviour))
+            return _prepared_demos.pop(key)
+    return behaviour_lib.get_demo_string(*args)
+
+
+def prefetch_demos(shot, hand, stat):
+    """
+    Tell the robot which demos could be shown while coaching a shot or stat, so it can load them before they are
+    needed. Nothing is sent if config.prefetch_demos is False or the same demos were the last ones sent.
+    :param shot :type str: the shot about to be coached.
+    :param hand :type str: the hand of the shot, "FH" or "BH".
+    :param stat :type str: the stat about to be coached, or None if only the shot has been chosen.
+    """
+    global _sent_demos
+    if not config.prefetch_demos or shot is None:
+        return
+    demos = get_demo_assets(shot, hand, stat, config.leftHand)
+    with _lock:
+        if demos == _sent_demos:
+            return
+        _sent_demos = demos
+    logging.debug("Prefetching demos " + str(demos))
+    output_client.post(config.post_address, json={"prefetch_demos": demos})
+
+
+def _wait_for_job():
+    with _lock:
+        job = _job
+    if job is not None:
+        try:
+            job.result()
+        except Exception as e:
+            logging.warning("Preparing utterances failed: " + str(e))
+
+
+def _prepare(behaviour_lib, goal_level, performance, phase, score, target, inputs):
+    # The policy observes the behaviour currently being performed before choosing the next one.
+    policy = inputs["policy"]
+    state = policy.get_observation(inputs["state"], inputs["behaviour"])
+    behaviours = policy.get_likely_behaviours(state, goal_level, performance, phase, config.prefetch_behaviours)
+    logging.debug("Preparing utterances for likely behaviours " + str(behaviours))
+    msg_performance = -1 if performance is None else performance
+    for behaviour in behaviours:
+        args = (behaviour, goal_level, msg_performance, phase, inputs["name"], inputs["shot"], inputs["hand"],
+                inputs["stat"], inputs["final_set"], inputs["second_set"], score, target)
+        prepared = behaviour_lib.peek_pre_msg(*args)
+        demo_args = (behaviour, goal_level, inputs["shot"], inputs["hand"], inputs["stat"], inputs["left_hand"], score,
+                     target)
+        demo = behaviour_lib.get_demo_string(*demo_args) if behaviour in MODELLING_BEHAVIOURS else None
+        with _lock:
+            if prepared is not None:
+                _prepared_msgs[(id(behaviour_lib),) + args] = prepared
+            if behaviour in MODELLING_BEHAVIOURS:
+                _prepared_demos[(id(behaviour_lib),) + demo_args] = demo
@@ -0,0 +1,101 @@
+"""Screen Updates
+
+Coalescing channel for the frequent display updates sent during a set: the rep counter on the robot's tablet screen
+and the silence posts which make the robot refresh its screen after a rep. Callers only record the latest value, so
+they return immediately (e.g. the API can respond to the guide app's shot post straight away). A background thread
+sends at most one rep counter update and one silence refresh every config.screen_frame_interval seconds; if several
+updates arrive within a frame, only the latest rep count and silence refresh are sent. Pending updates are flushed
+before every utterance (see output_client.post_utterance()) so a held silence refresh can never reach the robot after,
+and interrupt, the next utterance.
+...
+Methods
+-------
+set_rep_count(count)
+    Show a new rep count on the robot's screen.
+refresh_silence(output)
+    Ask the robot to refresh its screen without saying anything.
+flush()
+    Send any pending updates immediately.
+"""
+import threading
+import time
+
+from CoachingBehaviourTree import config, output_client
+
+_condition = threading.Condition()
+_pending_rep_count = None
+_pending_silence = None
+_last_sent_time = 0.0
+_worker = None
+
+
+def set_rep_count(count):
+    """
+    Show a new rep count on the robot's screen, replacing any count which hasn't been sent yet.
+    :param count :type int: the rep count to display, or 0 to reset the counter.
+    """
+    global _pending_rep_count
+    with _condition:
+        _pending_rep_count = count
+        _start_worker()
+        _condition.notify()
+
+
+def refresh_silence(output=None):
+    """
+    Ask the robot to refresh its screen without saying anything, replacing any refresh which hasn't been sent yet.
+    :param output :type dict: the data to post to the robot, by default {"silence": "True"}.
+    """
+    global _pending_silence
+    with _condition:
+        _pending_silence = {"silence": "True"} if output is None else output
+        _start_worker()
+        _condition.notify()
+
+
+def flush():
+    """
+    Send any pending updates immediately, e.g. at the end of the session or before an utterance is posted to the robot.
+    """
+    with _condition:
+        rep_count, silence = _take_pending()
+        _send(rep_count, silence)
+
+
+def _start_worker():
+    # Must be called with _condition held.
+    global _worker
+    if _worker is None:
+        _worker = threading.Thread(target=_run, name="screen-updates", daemon=True)
+        _worker.start()
+
+
+def _take_pending():
+    # Must be called with _condition held.
+    global _pending_rep_count, _pending_silence, _last_sent_time
+    rep_count, silence = _pending_rep_count, _pending_silence
+    _pending_rep_count = _pending_silence = None
+    _last_sent_time = time.monotonic()
+    return rep_count, silence
+
+
+def _run():
+    while True:
+        with _condition:
+            while _pending_rep_count is None and _pending_silence is None:
+                _condition.wait()
+            wait_time = _last_sent_time + config.screen_frame_interval - time.monotonic()
+            if wait_time > 0:
+                # Let any further updates in this frame replace the pending ones.
+                _condition.wait(wait_time)
+                continue
+            rep_count, silence = _take_pending()
+            # Queued while holding the lock so a flush() can't queue later posts ahead of these.
+            _send(rep_count, silence)
+
+
+def _send(rep_count, silence):
+    if rep_count is not None:
+        output_client.post(config.screen_post_address + str(rep_count) + "/newRep")
+    if silence is not None:
+        output_client.post(config.post_address, json=silence)
@@ -0,0 +1,1124 @@
+"""Session Data
+
+Storage for the data recorded about each participant across sessions: the number of sessions they have done, the
+result of each session, and for each exercise (hand + shot) their latest score and performance, the results of each
+stat and set, and their baseline for each stat. Nodes use the operations of a session store rather than reading and
+rewriting files themselves, so the storage can be changed in config without changing the behaviour tree.
+
+Three backends are available, chosen by config.session_data_backend:
+"text"
+    The original line-oriented text files under <root>/<participant>/: Sessions.txt, and for each exercise
+    <hand><shot>/Aggregator.txt, <hand><shot>/Baseline.txt and <hand><shot>/<session>.txt. Compatible with data
+    recorded before the session store was introduced.
+"jsonl"
+    Sessions.txt as above, but each exercise's files are keyed JSON Lines records (see session_records.py) so a stat's
+    result or baseline is found by key rather than by its position in the file. Text data can be converted with
+    migrate_session_data.py.
+"sqlite"
+    A single SQLite database per participant, <root>/<participant>/<config.session_db_filename>, with indexed tables
+    for sessions, shots (exercises), stats and sets, so each goal transition only touches the rows it changes.
+...
+Classes
+-------
+TextSessionStore
+    Session store which keeps data in the original text files.
+JSONLinesSessionStore
+    Session store which keeps each exercise's data in keyed JSON Lines files.
+SQLiteSessionStore
+    Session store which keeps data in an SQLite database.
+WriteBehindSessionStore
+    Wraps a session store so that writes are saved on a background thread.
+ParticipantProfile
+    Wraps a session store with an in-memory cache of the participant's data.
+
+Methods
+-------
+open_session_store(root, participant, backend)
+    Create a session store for a participant.
+get_session_store()
+    Get the session store for config.participantNo, using the root directory and backend set in config.
+close_session_store()
+    Close the session store returned by get_session_store().
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from CoachingBehaviourTree import config, session_records
+
+# The stats recorded in a baseline, in the order they are written.
+BASELINE_STATS = ["racketPreparation", "approachTiming", "impactCutAngle", "impactSpeed", "followThroughRoll",
+                  "followThroughTime"]
+
+_lock = threading.Lock()
+_store = None
+_store_key = None
+
+
+def open_session_store(root, participant, backend="text"):
+    """
+    Create a session store for a participant.
+    :param root :type str: the directory containing a directory of data for each participant.
+    :param participant :type str: the participant number.
+    :param backend :type str: "text", "jsonl" or "sqlite".
+    :return:type TextSessionStore or JSONLinesSessionStore or SQLiteSessionStore: the session store.
+    """
+    if backend == "text":
+        return TextSessionStore(root, participant)
+    elif backend == "jsonl":
+        return JSONLinesSessionStore(root, participant)
+    elif backend == "sqlite":
+        return SQLiteSessionStore(root, participant)
+    raise ValueError("Unknown session data backend: " + str(backend))
+
+
+def get_session_store():
+    """
+    Get the session store for config.participantNo, using config.session_data_root and config.session_data_backend,
+    wrapped in a WriteBehindSessionStore if config.session_data_write_behind is True and then in a ParticipantProfile.
+    The store is created on first use and reused until the participant or config changes.
+    :return:type ParticipantProfile: the session store.
+    """
+    global _store, _store_key
+    key = (config.session_data_root, config.participantNo, config.session_data_backend)
+    with _lock:
+        if _store is None or _store_key != key:
+            if _store is not None:
+                store = _store
+                _store = None
+                store.close()
+            _store = open_session_store(*key)
+            if config.session_data_write_behind:
+                _store = WriteBehindSessionStore(_store)
+            _store = ParticipantProfile(_store)
+            _store_key = key
+        return _store
+
+
+@atexit.register
+def close_session_store():
+    """
+    Close the session store returned by get_session_store(), e.g. at the end of the session. This is also run at
+    interpreter exit, so that queued writes are saved even if the session doesn't end cleanly.
+    """
+    global _store, _store_key
+    with _lock:
+        store = _store
+        _store = None
+        _store_key = None
+        if store is not None:
+            store.close()
+
+
+class TextSessionStore:
+    """
+    Session store which keeps data in the original line-oriented text files.
+    ...
+    Attributes
+    ----------
+    directory :type str
+        The participant's directory, <root>/<participant>.
+    _unsynced :type set[str]
+        Files written since the last sync().
+
+    Methods
+    -------
+    get_session_count()
+        Get the number of sessions the participant has started.
+    set_session_count(count)
+        Set the number of sessions the participant has started.
+    add_session_result(session, performance, score)
+        Record the result of a session.
+    get_last_session_result()
+        Get the result of the participant's most recent session.
+    get_exercise_result(hand, shot)
+        Get the participant's latest score and performance for an exercise.
+    create_exercise(hand, shot)
+        Create the records for an exercise the participant hasn't done before.
+    finish_exercise(hand, shot, session, score, performance)
+        Record the result of an exercise and merge its stat results into the latest results and baseline.
+    start_baseline(hand, shot, session)
+        Add an empty baseline for an exercise.
+    set_baseline_result(hand, shot, session, scores, accuracies)
+        Fill in the baseline started this session.
+    baseline_done(hand, shot, session)
+        Check whether the baseline for an exercise has been completed this session.
+    get_baseline(hand, shot)
+        Get the participant's latest baseline for an exercise.
+    get_stat_result(hand, shot, stat)
+        Get the participant's latest result for a stat.
+    start_stat(hand, shot, session, stat)
+        Record that a stat has been started.
+    set_stat_result(hand, shot, session, stat, score, accuracy, performance)
+        Record the result of the current stat.
+    set_set_count(hand, shot, session, stat, count)
+        Record the number of sets started for the current stat.
+    add_set_result(hand, shot, session, score, performance)
+        Record the result of a set of the current stat.
+    sync()
+        Make everything written since the last sync durable.
+    close()
+        Sync and release any resources held by the store.
+    """
+    def __init__(self, root, participant):
+        self.directory = os.path.join(root, participant)
+        self._unsynced = set()
+
+    def get_session_count(self):
+        """
+        Get the number of sessions the participant has started.
+        :return:type int: the number of sessions, or None if the participant has no data.
+        """
+        try:
+            return int(self._read_lines(self._sessions_filename())[0])
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def set_session_count(self, count):
+        """
+        Set the number of sessions the participant has started, creating their data if this is their first session.
+        :param count :type int: the number of sessions.
+        """
+        filename = self._sessions_filename()
+        if os.path.exists(filename):
+            file_contents = self._read_lines(filename)
+            file_contents[0] = str(count) + "\n"
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            file_contents = [str(count) + "\n"]
+        self._write_lines(filename, file_contents)
+
+    def add_session_result(self, session, performance, score):
+        """
+        Record the result of a session.
+        :param session :type int: the session number.
+        :param performance :type int: the overall performance for the session.
+        :param score :type float: the average score for the session.
+        """
+        filename = self._sessions_filename()
+        file_contents = self._read_lines(filename)
+        file_contents.insert(1, str(performance) + ", " + str(score) + "\n")
+        self._write_lines(filename, file_contents)
+
+    def get_last_session_result(self):
+        """
+        Get the result of the participant's most recent session.
+        :return:type tuple(int, float): the performance and score, or None if no session has been completed.
+        """
+        file_contents = self._read_lines(self._sessions_filename())
+        if len(file_contents) < 2:
+            return None
+        return int(file_contents[1].split(", ")[0]), float(file_contents[1].split(" ")[1])
+
+    def get_exercise_result(self, hand, shot):
+        """
+        Get the participant's latest score and performance for an exercise.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :return:type tuple(float, int): the score and performance (None if the exercise hasn't been completed yet), or
+            None if the participant hasn't done this exercise.
+        """
+        try:
+            file_contents = self._read_lines(self._aggregator_filename(hand, shot))
+        except OSError:
+            return None
+        score = float(file_contents[0].replace("\n", ""))
+        performance = int(file_contents[1].replace("\n", "")) if len(file_contents) > 1 else None
+        return score, performance
+
+    def create_exercise(self, hand, shot):
+        """
+        Create the records for an exercise the participant hasn't done before.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        """
+        os.makedirs(self._shot_directory(hand, shot), exist_ok=True)
+        self._append_lines(self._aggregator_filename(hand, shot), ["0"])
+
+    def finish_exercise(self, hand, shot, session, score, performance):
+        """
+        Record the result of an exercise, and copy the result of each stat done this session into the participant's
+        latest results and baseline.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param score :type float: the score for the exercise.
+        :param performance :type int: the performance for the exercise.
+        """
+        aggregator_contents = self._read_lines(self._aggregator_filename(hand, shot))
+        logging.debug("File contents = " + str(aggregator_contents))
+        this_session_contents = self._read_lines(self._session_filename(hand, shot, session))
+        baseline_contents = self._read_lines(self._baseline_filename(hand, shot))
+
+        this_session_contents.insert(0, str(score) + "\n")
+        this_session_contents.insert(1, str(performance) + "\n")
+
+        aggregator_contents[0] = str(score) + "\n"
+        if len(aggregator_contents) > 1:
+            aggregator_contents[1] = str(performance) + "\n"
+        else:
+            aggregator_contents.append(str(performance) + "\n")
+
+        this_session_line_no = 2
+        while len(this_session_contents) > this_session_line_no:
+            stat = this_session_contents[this_session_line_no]
+            this_session_line_no += 1
+            if not (stat in aggregator_contents):
+                aggregator_contents.append(stat)
+                aggregator_contents.append(this_session_contents[this_session_line_no])
+            else:
+                index = aggregator_contents.index(stat)
+                aggregator_contents[index + 1] = this_session_contents[this_session_line_no]
+
+            # Update baseline file
+            indices = [i for i, e in enumerate(baseline_contents) if e == stat]
+            index = indices[len(indices) - 1]
+            baseline_contents[index + 1] = this_session_contents[this_session_line_no]
+
+            this_session_line_no += 1
+            lines_to_add = int(this_session_contents[this_session_line_no]) + 1
+            this_session_line_no += lines_to_add
+
+        logging.debug("File contents = " + str(aggregator_contents))
+        self._write_lines(self._aggregator_filename(hand, shot), aggregator_contents)
+        self._write_lines(self._session_filename(hand, shot, session), this_session_contents)
+        self._write_lines(self._baseline_filename(hand, shot), baseline_contents)
+
+    def start_baseline(self, hand, shot, session):
+        """
+        Add an empty baseline for an exercise, to be filled in by set_baseline_result().
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        """
+        file_contents = []
+        for stat in BASELINE_STATS:
+            file_contents.append(stat + "\n")
+            file_contents.append("0\n")
+        self._append_lines(self._baseline_filename(hand, shot), file_contents)
+
+    def set_baseline_result(self, hand, shot, session, scores, accuracies):
+        """
+        Fill in the baseline started this session.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param scores :type dict[str, float]: the score for each stat in BASELINE_STATS.
+        :param accuracies :type dict[str, float]: the accuracy for each stat in BASELINE_STATS.
+        """
+        file_contents = self._read_lines(self._baseline_filename(hand, shot))
+        # The baselines of previous sessions come first, one for each previous session file.
+        content_index = 1 + (self._count_files(hand, shot) - 2) * 12
+        for stat_name in BASELINE_STATS[:len(scores)]:
+            file_contents[content_index] = str(scores[stat_name]) + ", " + str(accuracies[stat_name]) + ", \n"
+            content_index += 2
+        self._write_lines(self._baseline_filename(hand, shot), file_contents)
+
+    def baseline_done(self, hand, shot, session):
+        """
+        Check whether the baseline for an exercise has been completed this session.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :return:type bool: True if the baseline has been completed.
+        """
+        try:
+            f_contents = self._read_lines(self._baseline_filename(hand, shot))
+            required_length = 1 + (self._count_files(hand, shot) - 2) * 12
+        except OSError:
+            return False
+        logging.debug("required_length = " + str(required_length) + ", len(f_contents) = " + str(len(f_contents)))
+        return len(f_contents) > required_length and f_contents[required_length] != "0\n"
+
+    def get_baseline(self, hand, shot):
+        """
+        Get the participant's latest baseline for an exercise.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :return:type tuple(dict[str, float], dict[str, float], dict[str, int]): the accuracy, score and performance
+            for each stat, or None if there is no baseline.
+        """
+        try:
+            file_contents = self._read_lines(self._baseline_filename(hand, shot))
+            stat_acc_set = {}
+            stat_score_set = {}
+            stat_perf_set = {}
+            index = (self._count_files(hand, shot) - 3) * 12
+            while index < len(file_contents):
+                stat_name = file_contents[index].replace("\n", "")
+                split = file_contents[index + 1].split(", ")
+                stat_acc_set[stat_name] = float(split[1].replace("\n", "").replace(",", "").replace(" ", ""))
+                stat_score_set[stat_name] = float(split[0].replace("\n", "").replace(",", "").replace(" ", ""))
+                index += 2
+        except (OSError, IndexError, ValueError):
+            return None
+
+        # Performance is taken from the latest entry for each stat.
+        index = len(file_contents) - 1
+        while index >= 1:
+            stat_name = file_contents[index - 1].replace("\n", "")
+            if stat_name not in stat_perf_set:
+                split = file_contents[index].split(", ")
+                if len(split) > 2 and split[2] != "\n":
+                    stat_perf_set[stat_name] = int(split[2].replace("\n", "").replace(",", "").replace(" ", ""))
+                else:
+                    stat_perf_set[stat_name] = None
+            index -= 2
+        return stat_acc_set, stat_score_set, stat_perf_set
+
+    def get_stat_result(self, hand, shot, stat):
+        """
+        Get the participant's latest result for a stat.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param stat :type str: the stat name.
+        :return:type tuple(float, int): the score and performance (None if not recorded), or None if the participant
+            hasn't done this stat before.
+        """
+        file_contents = self._read_lines(self._aggregator_filename(hand, shot))
+        stat_name = str(stat) + "\n"
+        if stat_name not in file_contents:
+            return None
+        index = len(file_contents) - 1 - file_contents[::-1].index(stat_name)
+        split = file_contents[index + 1].split(", ")
+        performance = split[2].replace("\n", "").replace(",", "").replace(" ", "")
+        return float(split[0]), (None if performance == "None" else int(performance))
+
+    def start_stat(self, hand, shot, session, stat):
+        """
+        Record that a stat has been started.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param stat :type str: the stat name.
+        """
+        filename = self._session_filename(hand, shot, session)
+        try:
+            file_contents = self._read_lines(filename)
+        except OSError:
+            file_contents = []
+        file_contents.append(str(stat) + "\n")
+        self._write_lines(filename, file_contents)
+
+    def set_stat_result(self, hand, shot, session, stat, score, accuracy, performance):
+        """
+        Record the result of the most recently started occurrence of a stat.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param stat :type str: the stat name.
+        :param score :type float: the score for the stat.
+        :param accuracy :type float: the accuracy for the stat.
+        :param performance :type int: the performance for the stat.
+        """
+        filename = self._session_filename(hand, shot, session)
+        file_contents = self._read_lines(filename)
+        logging.debug("file contents of session_no.txt = " + str(file_contents))
+        index = self._last_index(file_contents, str(stat) + "\n")
+        file_contents.insert(index + 1, str(score) + ", " + str(accuracy) + ", " + str(performance) + ", \n")
+        self._write_lines(filename, file_contents)
+
+    def set_set_count(self, hand, shot, session, stat, count):
+        """
+        Record the number of sets started for the most recently started occurrence of a stat.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param stat :type str: the stat name.
+        :param count :type int: the number of sets started.
+        """
+        filename = self._session_filename(hand, shot, session)
+        file_contents = self._read_lines(filename)
+        index = self._last_index(file_contents, str(stat) + "\n")
+        if len(file_contents) > index + 1:
+            file_contents[index + 1] = str(count) + "\n"
+        else:
+            file_contents.append(str(count) + "\n")
+        self._write_lines(filename, file_contents)
+
+    def add_set_result(self, hand, shot, session, score, performance):
+        """
+        Record the result of a set of the current stat.
+        :param hand :type str: "FH" or "BH".
+        :param shot :type str: the shot name.
+        :param session :type int: the session number.
+        :param score :type float: the average score for the set.
+        :param performance :type int: the performance for the set.
+        """
+        filename = self._session_filename(hand, shot, session)
+        file_contents = self._read_lines(filename)
+        file_contents.append(str(score) + ", " + str(performance) + ", \n")
+        self._write_lines(filename, file_contents)
+
+    def sync(self):
+        """
+        Make everything written since the last sync durable, by fsyncing each file which has been written.
+        """
+        for filename in self._unsynced:
+            fd = os.open(filename, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._unsynced.clear()
+
+    def close(self):
+        """
+        Sync anything which has been written. The text store doesn't hold any other resources.
+        """
+        self.sync()
+
+    def _sessions_filename(self):
+        return os.path.join(self.directory, "Sessions.txt")
+
+    def _shot_directory(self, hand, shot):
+        return os.path.join(self.directory, str(hand) + str(shot))
+
+    def _aggregator_filename(self, hand, shot):
+        return os.path.join(self._shot_directory(hand, shot), "Aggregator.txt")
+
+    def _baseline_filename(self, hand, shot):
+        return os.path.join(self._shot_directory(hand, shot), "Baseline.txt")
+
+    def _session_filename(self, hand, shot, session):
+        return os.path.join(self._shot_directory(hand, shot), str(session) + ".txt")
+
+    def _count_files(self, hand, shot):
+        """
+        Count the files in an exercise's directory: Aggregator.txt, Baseline.txt and one file per session.
+        """
+        dir_path = self._shot_directory(hand, shot)
+        return len([path for path in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, path))])
+
+    @staticmethod
+    def _last_index(file_contents, line):
+        index = 0
+        for i in range(0, len(file_contents)):
+            if file_contents[i] == line:
+                index = i
+        return index
+
+    @staticmethod
+    def _read_lines(filename):
+        with open(filename, "r") as f:
+            return f.readlines()
+
+    def _write_lines(self, filename, file_contents):
+        with open(filename, "w") as f:
+            f.writelines(file_contents)
+        self._unsynced.add(filename)
+
+    def _append_lines(self, filename, file_contents):
+        with open(filename, "a") as f:
+            f.writelines(file_contents)
+        self._unsynced.add(filename)
+
+
+class JSONLinesSessionStore(TextSessionStore):
+    """
+    Session store which keeps Sessions.txt as text but stores each exercise's data in the keyed JSON Lines files
+    described in session_records.py (Aggregator.jsonl, Baseline.jsonl and <session>.jsonl), so each stat's result and
+    baseline is looked up by key. Existing text data can be converted with migrate_session_data.py.
+    ...
+    Attributes
+    ----------
+    directory :type str
+        The participant's directory, <root>/<participant>.
+
+    Methods
+    -------
+    See TextSessionStore, which has the same methods.
+    """
+    def get_exercise_result(self, hand, shot):
+        try:
+            aggregator = session_records.AggregatorRecords.read(self._aggregator_filename(hand, shot))
+        except OSError:
+            return None
+        return aggregator.score, aggregator.performance
+
+    def create_exercise(self, hand, shot):
+        os.makedirs(self._shot_directory(hand, shot), exist_ok=True)
+        filename = self._aggregator_filename(hand, shot)
+        if not os.path.exists(filename):
+            session_records.AggregatorRecords().write(filename)
+            self._unsynced.add(filename)
+
+    def finish_exercise(self, hand, shot, session, score, performance):
+        aggregator_filename = self._aggregator_filename(hand, shot)
+        baseline_filename = self._baseline_filename(hand, shot)
+        session_filename = self._session_filename(hand, shot, session)
+        aggregator = session_records.AggregatorRecords.read(aggregator_filename)
+        baseline = self._read_baseline(hand, shot)
+        session_records.append_records(session_filename, [{"record": "exercise", "score": score,
+                                                           "performance": performance}])
+
+        aggregator.score = score
+        aggregator.performance = performance
+        baseline_sessions = baseline.sessions()
+        for stat in session_records.read_session_stats(session_records.read_records(session_filename)):
+            result = stat["result"]
+            if result is None:
+                continue
+            aggregator.set_stat(stat["stat"], result["score"], result["accuracy"], result["performance"])
+            # Update the stat in the latest baseline which includes it.
+            for baseline_session in reversed(baseline_sessions):
+                if (baseline_session, stat["stat"]) in baseline.baselines:
+                    baseline.set(baseline_session, stat["stat"], result["score"], result["accuracy"],
+                                 result["performance"])
+                    break
+        aggregator.write(aggregator_filename)
+        baseline.write(baseline_filename)
+        self._unsynced.update([aggregator_filename, baseline_filename, session_filename])
+
+    def start_baseline(self, hand, shot, session):
+        baseline = self._read_baseline(hand, shot)
+        baseline.start(session, BASELINE_STATS)
+        self._write_baseline(hand, shot, baseline)
+
+    def set_baseline_result(self, hand, shot, session, scores, accuracies):
+        baseline = self._read_baseline(hand, shot)
+        for stat in BASELINE_STATS[:len(scores)]:
+            baseline.set(session, stat, scores[stat], accuracies[stat])
+        self._write_baseline(hand, shot, baseline)
+
+    def baseline_done(self, hand, shot, session):
+        return session in self._read_baseline(hand, shot).sessions(completed=True)
+
+    def get_baseline(self, hand, shot):
+        baseline = self._read_baseline(hand, shot)
+        sessions = baseline.sessions(completed=True)
+        if not sessions:
+            return None
+        records = baseline.get(sessions[-1])
+        return ({stat: record["accuracy"] for stat, record in records.items()},
+                {stat: record["score"] for stat, record in records.items()},
+                {stat: record["performance"] for stat, record in records.items()})
+
+    def get_stat_result(self, hand, shot, stat):
+        record = session_records.AggregatorRecords.read(self._aggregator_filename(hand, shot)).stats.get(str(stat))
+        return None if record is None else (record["score"], record["performance"])
+
+    def start_stat(self, hand, shot, session, stat):
+        self._append_record(hand, shot, session, {"record": "stat_start", "stat": str(stat)})
+
+    def set_stat_result(self, hand, shot, session, stat, score, accuracy, performance):
+        self._append_record(hand, shot, session, {"record": "stat_result", "stat": str(stat), "score": score,
+                                                  "accuracy": accuracy, "performance": performance})
+
+    def set_set_count(self, hand, shot, session, stat, count):
+        self._append_record(hand, shot, session, {"record": "set_count", "stat": str(stat), "count": count})
+
+    def add_set_result(self, hand, shot, session, score, performance):
+        self._append_record(hand, shot, session, {"record": "set", "score": score, "performance": performance})
+
+    def _aggregator_filename(self, hand, shot):
+        return os.path.join(self._shot_directory(hand, shot), "Aggregator.jsonl")
+
+    def _baseline_filename(self, hand, shot):
+        return os.path.join(self._shot_directory(hand, shot), "Baseline.jsonl")
+
+    def _session_filename(self, hand, shot, session):
+        return os.path.join(self._shot_directory(hand, shot), str(session) + ".jsonl")
+
+    def _read_baseline(self, hand, shot):
+        try:
+            return session_records.BaselineRecords.read(self._baseline_filename(hand, shot))
+        except OSError:
+            return session_records.BaselineRecords()
+
+    def _write_baseline(self, hand, shot, baseline):
+        filename = self._baseline_filename(hand, shot)
+        baseline.write(filename)
+        self._unsynced.add(filename)
+
+    def _append_record(self, hand, shot, session, record):
+        filename = self._session_filename(hand, shot, session)
+        session_records.append_records(filename, [record])
+        self._unsynced.add(filename)
+
+
+class SQLiteSessionStore:
+    """
+    Session store which keeps data in a single SQLite database per participant. The tables are:
+    participant
+        The number of sessions the participant has started.
+    sessions
+        The performance and score of each session.
+    shots
+        The latest score and performance for each exercise (hand + shot).
+    exercises
+        The score and performance for each time an exercise was completed.
+    stats
+        Each stat started in a session, with its result and number of sets. merged is set once the result has been
+        copied into shot_stats and baselines at the end of the exercise.
+    sets
+        The result of each set of a stat.
+    shot_stats
+        The latest result of each stat of each exercise.
+    baselines
+        The baseline for each stat of each exercise, for each session in which one was done.
+    Rows which hold only the latest value (participant, sessions, shots, shot_stats) are written with INSERT OR REPLACE
+    rather than an upsert, which needs SQLite 3.24; the system libsqlite3 on Ubuntu 16.04 is 3.11.
+    ...
+    Attributes
+    ----------
+    filename :type str
+        The database file, <root>/<participant>/<config.session_db_filename>.
+    connection :type sqlite3.Connection
+        The connection to the database.
+
+    Methods
+    -------
+    See TextSessionStore, which has the same methods.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS participant (id INTEGER PRIMARY KEY CHECK (id = 0), sessions INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS sessions (session INTEGER PRIMARY KEY, performance INTEGER, score REAL);
+        CREATE TABLE IF NOT EXISTS shots (hand TEXT NOT NULL, shot TEXT NOT NULL, score REAL, performance INTEGER,
+                                          PRIMARY KEY (hand, shot));
+        CREATE TABLE IF NOT EXISTS exercises (id INTEGER PRIMARY KEY, hand TEXT NOT NULL, shot TEXT NOT NULL,
+                                              session INTEGER NOT NULL, score REAL, performance INTEGER);
+        CREATE INDEX IF NOT EXISTS exercises_by_shot ON exercises (hand, shot, session);
+        CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY, hand TEXT NOT NULL, shot TEXT NOT NULL,
+                                          session INTEGER NOT NULL, stat TEXT NOT NULL, score REAL, accuracy REAL,
+                                          performance INTEGER, set_count INTEGER, merged INTEGER NOT NULL DEFAULT 0);
+        CREATE INDEX IF NOT EXISTS stats_by_session ON stats (hand, shot, session, stat);
+        CREATE TABLE IF NOT EXISTS sets (id INTEGER PRIMARY KEY, stat_id INTEGER NOT NULL REFERENCES stats (id),
+                                         score REAL, performance INTEGER);
+        CREATE INDEX IF NOT EXISTS sets_by_stat ON sets (stat_id);
+        CREATE TABLE IF NOT EXISTS shot_stats (hand TEXT NOT NULL, shot TEXT NOT NULL, stat TEXT NOT NULL, score REAL,
+                                               accuracy REAL, performance INTEGER, PRIMARY KEY (hand, shot, stat));
+        CREATE TABLE IF NOT EXISTS baselines (hand TEXT NOT NULL, shot TEXT NOT NULL, session INTEGER NOT NULL,
+                                              stat TEXT NOT NULL, score REAL, accuracy REAL, performance INTEGER,
+                                              completed INTEGER NOT NULL DEFAULT 0,
+                                              PRIMARY KEY (hand, shot, session, stat));
+    """
+
+    def __init__(self, root, participant):
+        directory = os.path.join(root, participant)
+        os.makedirs(directory, exist_ok=True)
+        self.filename = os.path.join(directory, config.session_db_filename)
+        # The connection is opened by the controller thread but may be used by a background writer.
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        # Commits are written to the write-ahead log without an fsync each; sync() makes them durable in one go.
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            self.connection.executescript(self.SCHEMA)
+
+    def get_session_count(self):
+        row = self.connection.execute("SELECT sessions FROM participant WHERE id = 0").fetchone()
+        return None if row is None else row[0]
+
+    def set_session_count(self, count):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO participant (id, sessions) VALUES (0, ?)", (count,))
+
+    def add_session_result(self, session, performance, score):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO sessions (session, performance, score) VALUES (?, ?, ?)",
+                                    (session, performance, score))
+
+    def get_last_session_result(self):
+        row = self.connection.execute("SELECT performance, score FROM sessions WHERE performance IS NOT NULL "
+                                      "ORDER BY session DESC LIMIT 1").fetchone()
+        return None if row is None else (int(row[0]), float(row[1]))
+
+    def get_exercise_result(self, hand, shot):
+        row = self.connection.execute("SELECT score, performance FROM shots WHERE hand = ? AND shot = ?",
+                                      (hand, str(shot))).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def create_exercise(self, hand, shot):
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO shots (hand, shot, score, performance) VALUES (?, ?, 0, NULL)",
+                                    (hand, str(shot)))
+
+    def finish_exercise(self, hand, shot, session, score, performance):
+        shot = str(shot)
+        with self.connection:
+            self.connection.execute("INSERT INTO exercises (hand, shot, session, score, performance) VALUES (?, ?, ?, ?, ?)",
+                                    (hand, shot, session, score, performance))
+            self.connection.execute("INSERT OR REPLACE INTO shots (hand, shot, score, performance) VALUES (?, ?, ?, ?)",
+                                    (hand, shot, score, performance))
+            # Stats finished earlier in the session are merged again so the latest occurrence of each stat wins;
+            # stats that were started but never finished have no score and are skipped.
+            rows = self.connection.execute("SELECT stat, score, accuracy, performance FROM stats "
+                                           "WHERE hand = ? AND shot = ? AND session = ? AND score IS NOT NULL "
+                                           "ORDER BY id",
+                                           (hand, shot, session)).fetchall()
+            for stat, stat_score, accuracy, stat_performance in rows:
+                self.connection.execute("INSERT OR REPLACE INTO shot_stats (hand, shot, stat, score, accuracy, "
+                                        "performance) VALUES (?, ?, ?, ?, ?, ?)",
+                                        (hand, shot, stat, stat_score, accuracy, stat_performance))
+                self.connection.execute("UPDATE baselines SET score = ?, accuracy = ?, performance = ?, completed = 1 "
+                                        "WHERE hand = ? AND shot = ? AND stat = ? AND session = "
+                                        "(SELECT MAX(session) FROM baselines WHERE hand = ? AND shot = ? AND stat = ?)",
+                                        (stat_score, accuracy, stat_performance, hand, shot, stat, hand, shot, stat))
+            self.connection.execute("UPDATE stats SET merged = 1 WHERE hand = ? AND shot = ? AND session = ?",
+                                    (hand, shot, session))
+
+    def start_baseline(self, hand, shot, session):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO baselines (hand, shot, session, stat) VALUES (?, ?, ?, ?)",
+                                        [(hand, str(shot), session, stat) for stat in BASELINE_STATS])
+
+    def set_baseline_result(self, hand, shot, session, scores, accuracies):
+        with self.connection:
+            self.connection.executemany("UPDATE baselines SET score = ?, accuracy = ?, completed = 1 "
+                                        "WHERE hand = ? AND shot = ? AND session = ? AND stat = ?",
+                                        [(scores[stat], accuracies[stat], hand, str(shot), session, stat)
+                                         for stat in BASELINE_STATS[:len(scores)]])
+
+    def baseline_done(self, hand, shot, session):
+        row = self.connection.execute("SELECT 1 FROM baselines WHERE hand = ? AND shot = ? AND session = ? AND "
+                                      "completed = 1 LIMIT 1", (hand, str(shot), session)).fetchone()
+        return row is not None
+
+    def get_baseline(self, hand, shot):
+        rows = self.connection.execute("SELECT stat, score, accuracy, performance FROM baselines "
+                                       "WHERE hand = ? AND shot = ? AND completed = 1 AND session = "
+                                       "(SELECT MAX(session) FROM baselines WHERE hand = ? AND shot = ? AND completed = 1)",
+                                       (hand, str(shot), hand, str(shot))).fetchall()
+        if not rows:
+            return None
+        stat_acc_set = {stat: accuracy for stat, _, accuracy, _ in rows}
+        stat_score_set = {stat: score for stat, score, _, _ in rows}
+        stat_perf_set = {stat: performance for stat, _, _, performance in rows}
+        return stat_acc_set, stat_score_set, stat_perf_set
+
+    def get_stat_result(self, hand, shot, stat):
+        row = self.connection.execute("SELECT score, performance FROM shot_stats WHERE hand = ? AND shot = ? AND stat = ?",
+                                      (hand, str(shot), str(stat))).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def start_stat(self, hand, shot, session, stat):
+        with self.connection:
+            self.connection.execute("INSERT INTO stats (hand, shot, session, stat) VALUES (?, ?, ?, ?)",
+                                    (hand, str(shot), session, str(stat)))
+
+    def set_stat_result(self, hand, shot, session, stat, score, accuracy, performance):
+        with self.connection:
+            self.connection.execute("UPDATE stats SET score = ?, accuracy = ?, performance = ? WHERE id = ?",
+                                    (score, accuracy, performance, self._current_stat_id(hand, shot, session, stat)))
+
+    def set_set_count(self, hand, shot, session, stat, count):
+        with self.connection:
+            self.connection.execute("UPDATE stats SET set_count = ? WHERE id = ?",
+                                    (count, self._current_stat_id(hand, shot, session, stat)))
+
+    def add_set_result(self, hand, shot, session, score, performance):
+        with self.connection:
+            self.connection.execute("INSERT INTO sets (stat_id, score, performance) VALUES (?, ?, ?)",
+                                    (self._current_stat_id(hand, shot, session), score, performance))
+
+    def sync(self):
+        self.connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self):
+        self.sync()
+        self.connection.close()
+
+    def _current_stat_id(self, hand, shot, session, stat=None):
+        """
+        Get the id of the most recently started stat for an exercise in a session (of the given stat, if not None).
+        """
+        if stat is None:
+            row = self.connection.execute("SELECT MAX(id) FROM stats WHERE hand = ? AND shot = ? AND session = ?",
+                                          (hand, str(shot), session)).fetchone()
+        else:
+            row = self.connection.execute("SELECT MAX(id) FROM stats WHERE hand = ? AND shot = ? AND session = ? AND "
+                                          "stat = ?", (hand, str(shot), session, str(stat))).fetchone()
+        if row is None or row[0] is None:
+            raise ValueError("No stat started for " + str(hand) + str(shot) + " in session " + str(session))
+        return row[0]
+
+
+class WriteBehindSessionStore:
+    """
+    Wraps a session store so that writes return immediately and are made durable on a background thread, keeping disk
+    I/O off the behaviour tree's critical path (e.g. between the end of a stat and the robot's feedback on it). Writes
+    are queued in order; the writer applies every write queued within config.session_data_sync_delay seconds of the
+    first and then syncs the store once for the whole batch. Reads wait for queued writes to be applied, so they always
+    see the data written before them. close() (also run at interpreter exit) applies and syncs everything still
+    queued. A failed write is logged when it happens, and the first failure since the last flush() is raised again by
+    flush() or close(), so the caller knows the session data wasn't all saved.
+    ...
+    Attributes
+    ----------
+    store :type TextSessionStore or SQLiteSessionStore
+        The wrapped session store.
+    errors :type int
+        The number of queued writes (or syncs) which have failed (each is logged).
+
+    Methods
+    -------
+    See TextSessionStore, which has the same methods, plus:
+    flush()
+        Block until every queued write has been applied and synced, raising the first failed write if there was one.
+    """
+    WRITES = ["set_session_count", "add_session_result", "create_exercise", "finish_exercise", "start_baseline",
+              "set_baseline_result", "start_stat", "set_stat_result", "set_set_count", "add_set_result"]
+    READS = ["get_session_count", "get_last_session_result", "get_exercise_result", "baseline_done", "get_baseline",
+             "get_stat_result"]
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, store):
+        self.store = store
+        self.errors = 0
+        self._error = None  # The first failure not yet raised by flush() or close().
+        self._store_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="session-data-writer", daemon=True)
+        self._writer.start()
+
+    def __getattr__(self, name):
+        # Only called for names not found normally, i.e. the store's operations.
+        if name in self.WRITES:
+            def write(*args):
+                if self._closed:
+                    raise ValueError("Session store is closed")
+                self._queue.put((name, args))
+            return write
+        elif name in self.READS:
+            def read(*args):
+                # A failed write is left for flush() or close() to raise, so reads carry on with what was saved.
+                self._wait()
+                with self._store_lock:
+                    return getattr(self.store, name)(*args)
+            return read
+        raise AttributeError(name)
+
+    def flush(self):
+        """
+        Block until every queued write has been applied and synced.
+        :raises Exception: the first write or sync which has failed since the last flush() or close().
+        """
+        self._wait()
+        self._raise_error()
+
+    def sync(self):
+        self.flush()
+
+    def close(self):
+        """
+        Apply and sync everything still queued, then stop the writer and close the wrapped store.
+        :raises Exception: the first write or sync which has failed since the last flush().
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._writer.join()
+        self.store.close()
+        self._raise_error()
+
+    def _wait(self):
+        self._queue.put(self._FLUSH)
+        self._queue.join()
+
+    def _raise_error(self):
+        with self._store_lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # Collect the writes which follow shortly after, unless a reader or close() is waiting.
+            end_time = time.monotonic() + config.session_data_sync_delay
+            while batch[-1] is not self._FLUSH and batch[-1] is not self._STOP:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, end_time - time.monotonic())))
+                except queue.Empty:
+                    break
+            with self._store_lock:
+                for item in batch:
+                    if item is self._STOP:
+                        stop = True
+                    elif item is not self._FLUSH:
+                        self._apply(*item)
+                try:
+                    self.store.sync()
+                except Exception as e:
+                    self._record_error(e)
+                    logging.exception("Failed to sync session data")
+            for _ in batch:
+                self._queue.task_done()
+
+    def _apply(self, name, args):
+        try:
+            getattr(self.store, name)(*args)
+        except Exception as e:
+            self._record_error(e)
+            logging.exception("Failed to write session data: " + name + str(args))
+
+    def _record_error(self, error):
+        # Must be called with _store_lock held.
+        self.errors += 1
+        if self._error is None:
+            self._error = error
+
+
+class ParticipantProfile:
+    """
+    In-memory cache of a participant's session data, indexed by (hand, shot) and (hand, shot, stat), so the behaviour
+    tree reads scores, performances and baselines from memory rather than from the store. The profile is loaded once
+    at the start of the session (see load()) and anything not loaded is read from the store the first time it is
+    needed. Writes go through to the wrapped store and update the cached values in place, following the same rules as
+    the store (e.g. stat results only become the latest results once the exercise is finished).
+    ...
+    Attributes
+    ----------
+    store :type TextSessionStore or SQLiteSessionStore or WriteBehindSessionStore
+        The wrapped session store.
+
+    Methods
+    -------
+    See TextSessionStore, which has the same methods, plus:
+    load(hands, shots)
+        Read everything the session may need for the given exercises from the store.
+    """
+    _UNKNOWN = object()
+
+    def __init__(self, store):
+        self.store = store
+        self._session_count = self._UNKNOWN
+        self._last_session_result = self._UNKNOWN
+        self._exercises = {}  # (hand, shot) -> (score, performance) or None
+        self._baselines = {}  # (hand, shot) -> (accuracies, scores, performances) or None
+        self._baselines_done = {}  # (hand, shot, session) -> bool
+        self._stat_results = {}  # (hand, shot, stat) -> (score, performance) or None
+        self._session_stats = {}  # (hand, shot, session) -> [[stat, (score, accuracy, performance) or None], ...]
+
+    def load(self, hands, shots):
+        """
+        Read everything the session may need for the given exercises from the store.
+        :param hands :type list[str]: the hands, e.g. ["FH", "BH"].
+        :param shots :type list[str]: the shot names.
+        """
+        self.get_session_count()
+        for hand in hands:
+            for shot in shots:
+                try:
+                    if self.get_exercise_result(hand, shot) is None:
+                        continue
+                    self.get_baseline(hand, shot)
+                    for stat in BASELINE_STATS:
+                        self.get_stat_result(hand, shot, stat)
+                except (OSError, IndexError, ValueError):
+                    # Unreadable data is left to the nodes to handle when they read it.
+                    logging.debug("Couldn't load profile data for " + str(hand) + str(shot))
+
+    def get_session_count(self):
+        if self._session_count is self._UNKNOWN:
+            self._session_count = self.store.get_session_count()
+        return self._session_count
+
+    def set_session_count(self, count):
+        self.store.set_session_count(count)
+        self._session_count = count
+
+    def add_session_result(self, session, performance, score):
+        self.store.add_session_result(session, performance, score)
+        self._last_session_result = (performance, score)
+
+    def get_last_session_result(self):
+        if self._last_session_result is self._UNKNOWN:
+            self._last_session_result = self.store.get_last_session_result()
+        return self._last_session_result
+
+    def get_exercise_result(self, hand, shot):
+        key = (hand, str(shot))
+        if key not in self._exercises:
+            self._exercises[key] = self.store.get_exercise_result(hand, shot)
+        return self._exercises[key]
+
+    def create_exercise(self, hand, shot):
+        self.store.create_exercise(hand, shot)
+        if self._exercises.get((hand, str(shot))) is None:
+            self._exercises[(hand, str(shot))] = (0.0, None)
+
+    def finish_exercise(self, hand, shot, session, score, performance):
+        self.store.finish_exercise(hand, shot, session, score, performance)
+        shot = str(shot)
+        self._exercises[(hand, shot)] = (score, performance)
+        baseline = self._baselines.get((hand, shot))
+        for stat, result in self._session_stats.get((hand, shot, session), []):
+            if result is None:
+                continue
+            stat_score, accuracy, stat_performance = result
+            self._stat_results[(hand, shot, stat)] = (stat_score, stat_performance)
+            if baseline is not None:
+                baseline[0][stat] = accuracy
+                baseline[1][stat] = stat_score
+                baseline[2][stat] = stat_performance
+        if baseline is None:
+            # Not cached, so read the merged baseline the next time it's needed.
+            self._baselines.pop((hand, shot), None)
+
+    def start_baseline(self, hand, shot, session):
+        self.store.start_baseline(hand, shot, session)
+        self._baselines_done[(hand, str(shot), session)] = False
+
+    def set_baseline_result(self, hand, shot, session, scores, accuracies):
+        self.store.set_baseline_result(hand, shot, session, scores, accuracies)
+        stats = BASELINE_STATS[:len(scores)]
+        self._baselines[(hand, str(shot))] = ({stat: accuracies[stat] for stat in stats},
+                                              {stat: scores[stat] for stat in stats},
+                                              {stat: None for stat in stats})
+        self._baselines_done[(hand, str(shot), session)] = True
+
+    def baseline_done(self, hand, shot, session):
+        key = (hand, str(shot), session)
+        if key not in self._baselines_done:
+            self._baselines_done[key] = self.store.baseline_done(hand, shot, session)
+        return self._baselines_done[key]
+
+    def get_baseline(self, hand, shot):
+        key = (hand, str(shot))
+        if key not in self._baselines:
+            self._baselines[key] = self.store.get_baseline(hand, shot)
+        baseline = self._baselines[key]
+        # Copies, so that changes made by the caller don't change the cache.
+        return None if baseline is None else tuple(dict(values) for values in baseline)
+
+    def get_stat_result(self, hand, shot, stat):
+        key = (hand, str(shot), str(stat))
+        if key not in self._stat_results:
+            self._stat_results[key] = self.store.get_stat_result(hand, shot, stat)
+        return self._stat_results[key]
+
+    def start_stat(self, hand, shot, session, stat):
+        self.store.start_stat(hand, shot, session, stat)
+        self._session_stats.setdefault((hand, str(shot), session), []).append([str(stat), None])
+        # Whether the baseline counts as done can depend on the stats started (e.g. the text store counts the session
+        # file start_stat() creates), so ask the store again next time.
+        self._baselines_done.pop((hand, str(shot), session), None)
+
+    def set_stat_result(self, hand, shot, session, stat, score, accuracy, performance):
+        self.store.set_stat_result(hand, shot, session, stat, score, accuracy, performance)
+        for entry in reversed(self._session_stats.get((hand, str(shot), session), [])):
+            if entry[0] == str(stat):
+                entry[1] = (score, accuracy, performance)
+                break
+
+    def set_set_count(self, hand, shot, session, stat, count):
+        self.store.set_set_count(hand, shot, session, stat, count)
+
+    def add_set_result(self, hand, shot, session, score, performance):
+        self.store.add_set_result(hand, shot, session, score, performance)
+
+    def sync(self):
+        self.store.sync()
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,260 @@
+"""Session Records
+
+Keyed JSON Lines format for the per-exercise session data files, used by the "jsonl" session data backend (see
+session_data.py) in place of the positional text files. Each line of a file is one JSON object (a record) with a
+"record" field giving its type, so values are found by key rather than by their position in the file:
+
+Aggregator.jsonl
+    {"record": "exercise", "score": ..., "performance": ...}
+        The participant's latest score and performance for the exercise.
+    {"record": "stat", "stat": ..., "score": ..., "accuracy": ..., "performance": ...}
+        The participant's latest result for a stat, one record per stat.
+Baseline.jsonl
+    {"record": "baseline", "session": ..., "stat": ..., "score": ..., "accuracy": ..., "performance": ...,
+     "completed": ...}
+        The baseline for a stat in a session, one record per (session, stat).
+<session>.jsonl
+    Append-only log of what happened in the exercise during a session, in order:
+    {"record": "stat_start", "stat": ...}, {"record": "set_count", "stat": ..., "count": ...},
+    {"record": "set", "score": ..., "performance": ...},
+    {"record": "stat_result", "stat": ..., "score": ..., "accuracy": ..., "performance": ...} and
+    {"record": "exercise", "score": ..., "performance": ...}.
+...
+Classes
+-------
+AggregatorRecords
+    The contents of an Aggregator.jsonl file, indexed by stat.
+BaselineRecords
+    The contents of a Baseline.jsonl file, indexed by (session, stat).
+
+Methods
+-------
+read_records(filename)
+    Read every record from a JSON Lines file.
+write_records(filename, records)
+    Replace the contents of a JSON Lines file.
+append_records(filename, records)
+    Add records to the end of a JSON Lines file.
+read_session_stats(records)
+    Fold the records of a <session>.jsonl file into the result of each stat.
+"""
+import json
+import logging
+import os
+
+
+def read_records(filename):
+    """
+    Read every record from a JSON Lines file. A line which can't be parsed (e.g. a partly written last line) is logged
+    and skipped.
+    :param filename :type str: the file to read.
+    :return:type list[dict]: the records, in the order they appear in the file.
+    """
+    records = []
+    with open(filename, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip() == "":
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning("Skipping unreadable line " + str(line_no) + " of " + filename)
+    return records
+
+
+def write_records(filename, records):
+    """
+    Replace the contents of a JSON Lines file. The records are written to a temporary file which is renamed over the
+    old one, so a reader never sees a half-written file.
+    :param filename :type str: the file to write.
+    :param records :type list[dict]: the records to write.
+    """
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+    os.replace(temp_filename, filename)
+
+
+def append_records(filename, records):
+    """
+    Add records to the end of a JSON Lines file, creating it if necessary.
+    :param filename :type str: the file to append to.
+    :param records :type list[dict]: the records to append.
+    """
+    with open(filename, "a") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def read_session_stats(records):
+    """
+    Fold the records of a <session>.jsonl file into the result of each stat started in the session.
+    :param records :type list[dict]: the records of the session file.
+    :return:type list[dict]: a dict for each stat started, in order, with "stat", "result" (a stat_result record, or
+        None if the stat wasn't finished), "set_count" and "sets" (a list of set records).
+    """
+    stats = []
+    for record in records:
+        kind = record.get("record")
+        if kind == "stat_start":
+            stats.append({"stat": record["stat"], "result": None, "set_count": 0, "sets": []})
+        elif kind == "stat_result" or kind == "set_count":
+            for stat in reversed(stats):
+                if stat["stat"] == record["stat"]:
+                    if kind == "stat_result":
+                        stat["result"] = record
+                    else:
+                        stat["set_count"] = record["count"]
+                    break
+        elif kind == "set" and stats:
+            stats[-1]["sets"].append(record)
+    return stats
+
+
+class AggregatorRecords:
+    """
+    The contents of an Aggregator.jsonl file, indexed by stat.
+    ...
+    Attributes
+    ----------
+    score :type float
+        The participant's latest score for the exercise.
+    performance :type int
+        The participant's latest performance for the exercise, or None if they haven't finished it yet.
+    stats :type dict[str, dict]
+        The latest stat record for each stat.
+
+    Methods
+    -------
+    read(filename)
+        Read an Aggregator.jsonl file.
+    write(filename)
+        Write these records to an Aggregator.jsonl file.
+    set_stat(stat, score, accuracy, performance)
+        Set the latest result for a stat.
+    """
+    def __init__(self, score=0.0, performance=None):
+        self.score = score
+        self.performance = performance
+        self.stats = {}
+
+    @classmethod
+    def read(cls, filename):
+        """
+        Read an Aggregator.jsonl file.
+        :param filename :type str: the file to read.
+        :return:type AggregatorRecords: the records in the file.
+        """
+        aggregator = cls()
+        for record in read_records(filename):
+            if record.get("record") == "exercise":
+                aggregator.score = record["score"]
+                aggregator.performance = record["performance"]
+            elif record.get("record") == "stat":
+                aggregator.stats[record["stat"]] = record
+        return aggregator
+
+    def write(self, filename):
+        """
+        Write these records to an Aggregator.jsonl file, replacing its contents.
+        :param filename :type str: the file to write.
+        """
+        write_records(filename, [{"record": "exercise", "score": self.score, "performance": self.performance}] +
+                      list(self.stats.values()))
+
+    def set_stat(self, stat, score, accuracy, performance):
+        """
+        Set the latest result for a stat.
+        :param stat :type str: the stat name.
+        :param score :type float: the score for the stat.
+        :param accuracy :type float: the accuracy for the stat.
+        :param performance :type int: the performance for the stat.
+        """
+        self.stats[stat] = {"record": "stat", "stat": stat, "score": score, "accuracy": accuracy,
+                            "performance": performance}
+
+
+class BaselineRecords:
+    """
+    The contents of a Baseline.jsonl file, indexed by (session, stat).
+    ...
+    Attributes
+    ----------
+    baselines :type dict[tuple(int, str), dict]
+        The baseline record for each (session, stat).
+
+    Methods
+    -------
+    read(filename)
+        Read a Baseline.jsonl file.
+    write(filename)
+        Write these records to a Baseline.jsonl file.
+    start(session, stats)
+        Add an empty baseline for a session.
+    set(session, stat, score, accuracy, performance)
+        Fill in the baseline for a stat in a session.
+    sessions(completed)
+        Get the sessions which have a baseline.
+    get(session)
+        Get the baseline records for a session, indexed by stat.
+    """
+    def __init__(self):
+        self.baselines = {}
+
+    @classmethod
+    def read(cls, filename):
+        """
+        Read a Baseline.jsonl file.
+        :param filename :type str: the file to read.
+        :return:type BaselineRecords: the records in the file.
+        """
+        baseline = cls()
+        for record in read_records(filename):
+            if record.get("record") == "baseline":
+                baseline.baselines[(record["session"], record["stat"])] = record
+        return baseline
+
+    def write(self, filename):
+        """
+        Write these records to a Baseline.jsonl file, replacing its contents.
+        :param filename :type str: the file to write.
+        """
+        write_records(filename, list(self.baselines.values()))
+
+    def start(self, session, stats):
+        """
+        Add an empty baseline for a session, replacing any baseline already started in that session.
+        :param session :type int: the session number.
+        :param stats :type list[str]: the stats in the baseline.
+        """
+        for stat in stats:
+            self.baselines[(session, stat)] = {"record": "baseline", "session": session, "stat": stat, "score": None,
+                                               "accuracy": None, "performance": None, "completed": False}
+
+    def set(self, session, stat, score, accuracy, performance=None):
+        """
+        Fill in the baseline for a stat in a session.
+        :param session :type int: the session number.
+        :param stat :type str: the stat name.
+        :param score :type float: the score for the stat.
+        :param accuracy :type float: the accuracy for the stat.
+        :param performance :type int: the performance for the stat, or None.
+        """
+        self.baselines[(session, stat)] = {"record": "baseline", "session": session, "stat": stat, "score": score,
+                                           "accuracy": accuracy, "performance": performance, "completed": True}
+
+    def sessions(self, completed=False):
+        """
+        Get the sessions which have a baseline.
+        :param completed :type bool: if True, only include sessions whose baseline has been filled in.
+        :return:type list[int]: the session numbers, in ascending order.
+        """
+        return sorted({session for (session, _), record in self.baselines.items()
+                       if record["completed"] or not completed})
+
+    def get(self, session):
+        """
+        Get the baseline records for a session.
+        :param session :type int: the session number.
+        :return:type dict[str, dict]: the baseline record for each stat.
+        """
+        return {stat: record for (record_session, stat), record in self.baselines.items() if record_session == session}
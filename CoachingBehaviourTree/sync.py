@@ -0,0 +1,174 @@
+"""Sync
+
+Synchronisation between the API thread, which handles requests from the guide app, and the controller thread, which
+ticks the behaviour tree. Both sides share state through config, so rather than spinning on config variables, a waiter
+blocks on a condition which the controller notifies after every tick of the tree (the tick may have changed any of the
+config values being waited on). Waiters re-check their predicate every config.sync_poll_interval seconds as well, so a
+missed notification can only delay, not block, a waiter.
+
+In the other direction, nodes which can't progress until the guide app or user sends something call tree_waiting()
+before returning. Rather than immediately ticking again, the controller then parks the tree until the API calls
+wake_tree() or config.tick_idle_timeout passes (so time based checks such as DurationCheck still run).
+
+Utterances sent to the robot are tracked until the robot acknowledges that it has finished saying them (by posting the
+utterance id back to the API), so the tree waits for the robot's speech rather than for a fixed time or for the post
+itself. Robots which don't send acknowledgements have an utterance acknowledged when its post gets a response.
+...
+Methods
+-------
+notify()
+    Wake everything waiting so it re-checks its predicate.
+wait_until(predicate, timeout)
+    Block until predicate() is True or the timeout expires.
+begin_tick()
+    Reset the waiting state of the tree before it is ticked.
+tree_waiting()
+    Record that a node in the current tick is waiting on input from the guide app or user.
+park_tree(timeout)
+    If a node in the last tick was waiting, block until the tree is woken or the timeout expires.
+wake_tree()
+    Wake the tree, e.g. because the API has received new data.
+utterance_started()
+    Record that an utterance is being sent to the robot and get the id the robot will acknowledge it with.
+utterance_finished(utterance_id)
+    Record that the robot has finished an utterance.
+utterance_pending(utterance_id)
+    Check whether the robot is still saying the given utterance.
+speaking()
+    Check whether the robot is still saying any utterance.
+"""
+import logging
+import threading
+import time
+
+from CoachingBehaviourTree import config
+
+_condition = threading.Condition()
+_tree_wakeup = threading.Event()
+_tree_waiting = False
+_speech_lock = threading.Lock()
+_utterance_count = 0
+_pending_utterances = {}  # Utterance id -> time.monotonic() when it was sent.
+
+
+def notify():
+    """
+    Wake everything waiting, so that it re-checks its predicate.
+    """
+    with _condition:
+        _condition.notify_all()
+
+
+def wait_until(predicate, timeout=None):
+    """
+    Block until predicate() is True, or timeout seconds have passed.
+    :param predicate :type function: checked whenever notify() is called (and every config.sync_poll_interval seconds).
+    :param timeout :type float: maximum number of seconds to wait, or None to wait indefinitely.
+    :return:type bool: True if predicate() became True, False if we timed out.
+    """
+    # Whatever the caller changed before waiting is for the tree to act on.
+    wake_tree()
+    end_time = None if timeout is None else time.monotonic() + timeout
+    with _condition:
+        while not predicate():
+            if end_time is None:
+                wait_time = config.sync_poll_interval
+            else:
+                wait_time = min(config.sync_poll_interval, end_time - time.monotonic())
+                if wait_time <= 0:
+                    return False
+            _condition.wait(wait_time)
+    return True
+
+
+def begin_tick():
+    """
+    Reset the waiting state of the tree before it is ticked. Any wake_tree() from now on will stop the next park_tree()
+    from blocking.
+    """
+    global _tree_waiting
+    _tree_waiting = False
+    _tree_wakeup.clear()
+
+
+def tree_waiting():
+    """
+    Record that a node in the current tick can't progress until the guide app or user sends more data.
+    """
+    global _tree_waiting
+    _tree_waiting = True
+
+
+def park_tree(timeout):
+    """
+    If a node in the last tick was waiting on input, block until wake_tree() is called or the timeout expires.
+    :param timeout :type float: maximum number of seconds to park the tree for.
+    :return:type bool: True if the tree was woken (or wasn't waiting), False if the timeout expired.
+    """
+    if not _tree_waiting:
+        return True
+    return _tree_wakeup.wait(timeout)
+
+
+def wake_tree():
+    """
+    Wake the tree if it is parked, e.g. because the API has received new data from the guide app.
+    """
+    _tree_wakeup.set()
+
+
+def utterance_started():
+    """
+    Record that an utterance is about to be sent to the robot.
+    :return:type int: the id to send with the utterance, which the robot acknowledges when it has finished it.
+    """
+    global _utterance_count
+    with _speech_lock:
+        _utterance_count += 1
+        _pending_utterances[_utterance_count] = time.monotonic()
+        return _utterance_count
+
+
+def utterance_finished(utterance_id):
+    """
+    Record that the robot has finished an utterance, and wake the tree so that it can carry on.
+    :param utterance_id :type int: the id returned by utterance_started().
+    :return:type bool: True if the utterance was still pending, False if it had already finished (or is unknown).
+    """
+    with _speech_lock:
+        pending = _pending_utterances.pop(utterance_id, None) is not None
+    wake_tree()
+    return pending
+
+
+def utterance_pending(utterance_id):
+    """
+    Check whether the robot is still saying an utterance. An utterance which hasn't been acknowledged within
+    config.utterance_ack_timeout seconds is treated as finished.
+    :param utterance_id :type int: the id returned by utterance_started().
+    :return:type bool: True if the utterance hasn't been acknowledged yet.
+    """
+    with _speech_lock:
+        _expire_utterances()
+        return utterance_id in _pending_utterances
+
+
+def speaking():
+    """
+    Check whether the robot is still saying any utterance.
+    :return:type bool: True if any utterance hasn't been acknowledged yet.
+    """
+    with _speech_lock:
+        _expire_utterances()
+        return len(_pending_utterances) > 0
+
+
+def _expire_utterances():
+    if config.utterance_ack_timeout is None:
+        return
+    now = time.monotonic()
+    for utterance_id, sent_time in list(_pending_utterances.items()):
+        if now - sent_time > config.utterance_ack_timeout:
+            logging.warning("No acknowledgement for utterance " + str(utterance_id) + " after " +
+                            str(config.utterance_ack_timeout) + "s, carrying on")
+            del _pending_utterances[utterance_id]
@@ -1,4 +1,3 @@
-import ast
 import logging
 import os
 from abc import ABC
@@ -9,8 +8,10 @@ from gym import spaces
 import numpy as np
 from typing import Optional
 # from gym.utils.renderer import Renderer
-from CoachingBehaviourTree import controller, nodes, config
+from CoachingBehaviourTree import controller, nodes, config, sync, session_data
+from Policy import policy_store
 from Policy.policy import Policy
+from Policy.policy_history import PolicyHistory
 
 from Policy.policy_wrapper import PolicyWrapper
 
@@ -51,21 +52,20 @@ class CoachingEnvironment(gym.Env, ABC):
         # Will be called at the start of a new session, so load the policy from file, or choose policy if first session.
         super().reset(seed=seed)
 
-        filename = "/home/martin/PycharmProjects/coachingPolicies/AdaptedPolicies/" + config.participant_filename
-        if os.path.exists(filename):
-            f = open(filename, "r")
-            contents = f.readlines()
-            f.close()
-            matrix = ast.literal_eval(contents[0][:-1])
-            try:
-                f = open(
-                    "~/PycharmProjects/coachingPolicies/SessionDataFiles/" + config.participantNo + "/Sessions.txt",
-                    "r")
-                file_contents = f.readlines()
-                f.close()
-                config.sessions = int(file_contents[0]) + 1
-            except:
-                config.sessions = 1
+        directory = "/home/martin/PycharmProjects/coachingPolicies/AdaptedPolicies/"
+        filename = directory + config.participant_filename
+        store_filename = directory + config.policy_store_filename
+        history = PolicyHistory(directory + config.policy_history_filename)
+        if os.path.exists(store_filename) or len(history) > 0 or os.path.exists(filename):
+            # Eligibility traces are stored too but each session starts with fresh traces.
+            if len(history) > 0:  # The history is authoritative, and its index finds the latest policy directly.
+                matrix, _, _ = history.latest()
+            elif os.path.exists(store_filename):  # History missing, e.g. the policy file was copied across without it.
+                matrix, _, _ = policy_store.load_policy(store_filename)
+            else:  # Policy from before the binary store was introduced, it will be written as binary at the end.
+                matrix, _, _ = policy_store.import_text_policy(filename)
+            sessions = session_data.get_session_store().get_session_count()
+            config.sessions = 1 if sessions is None else sessions + 1
             observation = 0
             self.policy = PolicyWrapper(policy=matrix)
             logging.info("Using policy from file. Policy = " + str(self.policy.get_matrix()))
@@ -126,7 +126,12 @@ class CoachingEnvironment(gym.Env, ABC):
 
         logging.debug("config.behaviour = " + str(config.behaviour))
         while not config.need_new_behaviour:  # Keep ticking the tree until a behaviour is given by the robot. This is the point the controller can select a new action and learn.
+            sync.begin_tick()
             result = self.coaching_tree.tick()
+            # The tick may have changed any of the config values the API is waiting on, so wake it to re-check.
+            sync.notify()
+            # If the tree is only waiting on the guide app or user, don't tick again until the API has new data.
+            sync.park_tree(config.tick_idle_timeout)
             if config.behaviour_displayed:
                 logging.debug("Tree ticked, not returning: " + str(result))
             else:
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class EligibilityTraces:
+    """
+    Store for the SARSA(lambda) eligibility traces of a policy. The full trace values are kept in a dense float64 array
+    but the (state, action) pairs whose trace is at least threshold are also tracked in a set, so that an update only
+    has to visit the recently visited pairs rather than every cell of the matrix.
+    ...
+    Attributes
+    ----------
+    values :type np.ndarray
+        The dense 2D float64 array of trace values.
+    threshold :type float
+        Traces below this value are treated as inactive and are no longer updated or decayed.
+    _active :type set[int]
+        Flat (row-major) indices of the pairs whose trace is >= threshold.
+
+    Methods
+    -------
+    get(state, action)
+        Get the trace of a single (state, action) pair.
+    set(state, action, value)
+        Set the trace of a single (state, action) pair, adding or evicting it from the active set.
+    update_active(matrix, step, decay)
+        Apply the traced update to matrix for every active pair, then decay and evict traces.
+    tolist()
+        Get the trace values as nested lists.
+    """
+    def __init__(self, shape, threshold):
+        self.values = np.zeros(shape, dtype=np.float64)
+        self.threshold = threshold
+        self._active = set()
+
+    def __len__(self):
+        return len(self._active)
+
+    def get(self, state, action):
+        """
+        Get the trace of a single (state, action) pair.
+        :param state :type int: the row of the traces.
+        :param action :type int: the column of the traces.
+        :return:type float: the trace stored at [state][action].
+        """
+        return float(self.values[state, action])
+
+    def set(self, state, action, value):
+        """
+        Set the trace of a single (state, action) pair and keep the active set in step with it.
+        :param state :type int: the row of the traces.
+        :param action :type int: the column of the traces.
+        :param value :type float: the new trace value.
+        """
+        self.values[state, action] = value
+        index = state * self.values.shape[1] + action
+        if value >= self.threshold:
+            self._active.add(index)
+        else:
+            self._active.discard(index)
+
+    def update_active(self, matrix, step, decay):
+        """
+        For every active pair, move matrix[state][action] by step * trace (clamped so it can't go below 0), then
+        multiply the trace by decay and evict any pair whose trace has dropped below the threshold.
+        :param matrix :type np.ndarray: the C-contiguous transition matrix to update in place.
+        :param step :type float: alpha * td_error for the current step.
+        :param decay :type float: gamma * lambda.
+        :return:type np.ndarray: the rows of matrix which were changed.
+        """
+        if not self._active:
+            return np.empty(0, dtype=np.intp)
+        index = np.fromiter(self._active, dtype=np.intp, count=len(self._active))
+        flat_matrix = matrix.reshape(-1)
+        flat_traces = self.values.reshape(-1)
+        traces = flat_traces[index]
+        flat_matrix[index] = np.maximum(0.0, flat_matrix[index] + step * traces)
+        traces *= decay
+        flat_traces[index] = traces
+        self._active.difference_update(index[traces < self.threshold].tolist())
+        return np.unique(index // self.values.shape[1])
+
+    def tolist(self):
+        """
+        Get the trace values as nested lists.
+        :return:type list[list[float]]: a copy of the trace values.
+        """
+        return self.values.tolist()
@@ -0,0 +1,163 @@
+import logging
+import os
+import struct
+import zlib
+
+from Policy import policy_store
+
+RECORD_MAGIC = b"CPHR"
+INDEX_MAGIC = b"CPHI"
+# magic, payload length, crc32 of payload
+RECORD_HEADER = struct.Struct("<4sQI")
+# magic, number of records, offset of latest record, offset of end of last complete record, crc32 of the above
+INDEX_FORMAT = struct.Struct("<4sQQQI")
+
+
+class PolicyHistory:
+    """
+    Append-only log of every adapted policy a participant has had, one record per session. Each record is a header
+    (magic, length, crc32) followed by a binary policy (see policy_store). A small index file next to the log holds the
+    number of records and the offsets of the latest record and the end of the log, so the latest policy can be read
+    without scanning the history. The index is replaced atomically after each append, so a crash part way through an
+    append leaves the earlier sessions, and the index pointing at them, intact; the partial record is overwritten by
+    the next append. The history is the authoritative record of the participant's policy: the next session starts from
+    its latest policy, and the copy in the binary policy store (see policy_store) is only written after an append
+    succeeds and only read if the history is missing.
+    ...
+    Attributes
+    ----------
+    filename :type str
+        The log file, e.g. AdaptedPolicies/<participant>_history.bin.
+    index_filename :type str
+        The index file (filename + ".idx").
+
+    Methods
+    -------
+    append(matrix, traces, cumulative_reward)
+        Append a policy to the end of the history.
+    latest()
+        Read the most recent policy in the history.
+    read_all()
+        Read every policy in the history, oldest first.
+    import_text(filename)
+        Append every policy from a legacy text history file.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+
+    def __len__(self):
+        return self._read_index()[0]
+
+    def append(self, matrix, traces, cumulative_reward):
+        """
+        Append a policy to the end of the history and point the index at it.
+        :param matrix :type np.ndarray or list[list[float]]: the transition matrix.
+        :param traces :type np.ndarray or list[list[float]]: the eligibility traces, or None.
+        :param cumulative_reward :type float: the cumulative reward of the session which produced this policy.
+        :return:type int: the number of policies now in the history.
+        """
+        count, _, end = self._read_index()
+        payload = policy_store.policy_to_bytes(matrix, traces, cumulative_reward)
+        with open(self.filename, "a+b") as f:
+            # Drop anything left behind by an append which didn't complete.
+            f.truncate(end)
+            f.write(RECORD_HEADER.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        new_end = end + RECORD_HEADER.size + len(payload)
+        self._write_index(count + 1, end, new_end)
+        return count + 1
+
+    def latest(self):
+        """
+        Read the most recent policy in the history.
+        :return:type tuple(np.ndarray, np.ndarray, float): the transition matrix, eligibility traces and cumulative
+            reward, or None if the history is empty.
+        """
+        count, latest, _ = self._read_index()
+        if count == 0:
+            return None
+        with open(self.filename, "rb") as f:
+            f.seek(latest)
+            return self._read_record(f)
+
+    def read_all(self):
+        """
+        Read every policy in the history, oldest first.
+        :return:type list[tuple(np.ndarray, np.ndarray, float)]: the transition matrix, eligibility traces and
+            cumulative reward of each session.
+        """
+        count, _, end = self._read_index()
+        records = []
+        if count == 0:
+            return records
+        with open(self.filename, "rb") as f:
+            while f.tell() < end:
+                records.append(self._read_record(f))
+        return records
+
+    def import_text(self, filename):
+        """
+        Append every policy from a legacy text history file (oldest first) so earlier sessions aren't lost.
+        :param filename :type str: the legacy <participant>_history.txt file.
+        :return:type int: the number of policies imported.
+        """
+        history = policy_store.import_text_history(filename)
+        for matrix, cumulative_reward in history:
+            self.append(matrix, None, cumulative_reward)
+        return len(history)
+
+    def _read_record(self, f):
+        header = f.read(RECORD_HEADER.size)
+        magic, length, crc = RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if magic != RECORD_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+            raise ValueError("Corrupt record in policy history " + self.filename)
+        return policy_store.policy_from_bytes(payload, self.filename)
+
+    def _read_index(self):
+        """
+        Read the index, rebuilding it from the log if it is missing or damaged.
+        :return:type tuple(int, int, int): the number of records, the offset of the latest record and the offset of the
+            end of the last complete record.
+        """
+        try:
+            with open(self.index_filename, "rb") as f:
+                data = f.read(INDEX_FORMAT.size)
+            magic, count, latest, end, crc = INDEX_FORMAT.unpack(data)
+            if magic == INDEX_MAGIC and crc == zlib.crc32(data[:-4]):
+                return count, latest, end
+            logging.warning("Policy history index " + self.index_filename + " is damaged, rebuilding it")
+        except (OSError, struct.error):
+            pass
+        if not os.path.exists(self.filename):
+            return 0, 0, 0
+        return self._rebuild_index()
+
+    def _rebuild_index(self):
+        """
+        Scan the log for complete records, e.g. if the index has been deleted, and write a new index.
+        :return:type tuple(int, int, int): the number of records, the offset of the latest record and the offset of the
+            end of the last complete record.
+        """
+        count = latest = end = 0
+        with open(self.filename, "rb") as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                magic, length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if magic != RECORD_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                    break
+                count += 1
+                latest = end
+                end = f.tell()
+        self._write_index(count, latest, end)
+        return count, latest, end
+
+    def _write_index(self, count, latest, end):
+        data = INDEX_FORMAT.pack(INDEX_MAGIC, count, latest, end, 0)[:-4]
+        policy_store.atomic_write(self.index_filename, data + struct.pack("<I", zlib.crc32(data)))
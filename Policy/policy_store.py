@@ -0,0 +1,155 @@
+"""Policy Store
+
+Reads and writes adapted policies in a compact binary (.npz) format, replacing the str()/ast.literal_eval text format
+previously used in AdaptedPolicies/<participant>_history.txt. Each file holds a versioned header, the transition matrix,
+the eligibility traces and the cumulative reward of the session which produced it.
+...
+Methods
+-------
+save_policy(filename, matrix, traces, cumulative_reward)
+    Atomically write a policy to a binary policy file.
+load_policy(filename)
+    Read a policy from a binary policy file.
+policy_to_bytes(matrix, traces, cumulative_reward)
+    Serialise a policy to the bytes of a binary policy file.
+policy_from_bytes(data, name)
+    Deserialise a policy from the bytes of a binary policy file.
+import_text_policy(filename)
+    Read the most recent policy from a legacy text history file.
+import_text_history(filename)
+    Read every policy from a legacy text history file, oldest first.
+atomic_write(filename, data)
+    Write bytes to a file so that it either has its old contents or the new ones, never a mixture.
+"""
+import ast
+import io
+import json
+import os
+
+import numpy as np
+
+FORMAT_NAME = "coaching-policy"
+FORMAT_VERSION = 1
+
+
+def save_policy(filename, matrix, traces, cumulative_reward):
+    """
+    Atomically write a policy to a binary policy file.
+    :param filename :type str: the file to write (conventionally ending in .npz).
+    :param matrix :type np.ndarray or list[list[float]]: the transition matrix.
+    :param traces :type np.ndarray or list[list[float]]: the eligibility traces (same shape as matrix), or None.
+    :param cumulative_reward :type float: the cumulative reward of the session which produced this policy.
+    """
+    atomic_write(filename, policy_to_bytes(matrix, traces, cumulative_reward))
+
+
+def load_policy(filename):
+    """
+    Read a policy from a binary policy file.
+    :param filename :type str: the file written by save_policy().
+    :return:type tuple(np.ndarray, np.ndarray, float): the transition matrix, eligibility traces and cumulative reward.
+    """
+    with open(filename, "rb") as f:
+        return policy_from_bytes(f.read(), filename)
+
+
+def policy_to_bytes(matrix, traces, cumulative_reward):
+    """
+    Serialise a policy to the bytes of a binary policy file.
+    :param matrix :type np.ndarray or list[list[float]]: the transition matrix.
+    :param traces :type np.ndarray or list[list[float]]: the eligibility traces (same shape as matrix), or None.
+    :param cumulative_reward :type float: the cumulative reward of the session which produced this policy.
+    :return:type bytes: the serialised policy.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    traces = np.zeros_like(matrix) if traces is None else np.asarray(traces, dtype=np.float64)
+    buffer = io.BytesIO()
+    np.savez(buffer, format=np.array(FORMAT_NAME), version=np.array(FORMAT_VERSION), matrix=matrix, traces=traces,
+             cumulative_reward=np.array(0.0 if cumulative_reward is None else cumulative_reward, dtype=np.float64))
+    return buffer.getvalue()
+
+
+def policy_from_bytes(data, name="policy"):
+    """
+    Deserialise a policy from the bytes of a binary policy file.
+    :param data :type bytes: the serialised policy.
+    :param name :type str: where the bytes came from, used in error messages.
+    :return:type tuple(np.ndarray, np.ndarray, float): the transition matrix, eligibility traces and cumulative reward.
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as contents:
+        if "format" not in contents or str(contents["format"]) != FORMAT_NAME:
+            raise ValueError(name + " is not a policy file")
+        version = int(contents["version"])
+        if version > FORMAT_VERSION:
+            raise ValueError(name + " has policy file version " + str(version) + ", only versions up to " +
+                             str(FORMAT_VERSION) + " are supported")
+        return contents["matrix"], contents["traces"], float(contents["cumulative_reward"])
+
+
+def atomic_write(filename, data):
+    """
+    Write bytes to a file so that after a crash it either has its old contents or the new ones, never a mixture. The
+    data is written and synced to a temporary file in the same directory which is then renamed over filename.
+    :param filename :type str: the file to write.
+    :param data :type bytes: the new contents of the file.
+    """
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+
+
+def import_text_policy(filename):
+    """
+    Read the most recent policy from a legacy text history file, where the newest matrix is written on the first line
+    and its cumulative reward on the second.
+    :param filename :type str: the legacy <participant>_history.txt file.
+    :return:type tuple(np.ndarray, np.ndarray, float): the transition matrix, zeroed eligibility traces (not stored in
+        the text format) and cumulative reward (None if missing).
+    """
+    with open(filename, "r") as f:
+        matrix_line = f.readline().strip()
+        reward_line = f.readline().strip()
+    try:
+        # The matrix is written with str() on nested lists of numbers, which is valid JSON and much faster to parse.
+        matrix = json.loads(matrix_line)
+    except ValueError:
+        matrix = ast.literal_eval(matrix_line)
+    matrix = np.array(matrix, dtype=np.float64)
+    try:
+        cumulative_reward = float(reward_line)
+    except ValueError:
+        cumulative_reward = None
+    return matrix, np.zeros_like(matrix), cumulative_reward
+
+
+def import_text_history(filename):
+    """
+    Read every policy from a legacy text history file. The file holds a matrix line followed by a cumulative reward
+    line for each session, newest first.
+    :param filename :type str: the legacy <participant>_history.txt file.
+    :return:type list[tuple(np.ndarray, float)]: the transition matrix and cumulative reward (None if missing) of each
+        session, oldest first.
+    """
+    with open(filename, "r") as f:
+        lines = [line.strip() for line in f if line.strip() != ""]
+    history = []
+    index = 0
+    while index < len(lines):
+        try:
+            matrix = json.loads(lines[index])
+        except ValueError:
+            matrix = ast.literal_eval(lines[index])
+        cumulative_reward = None
+        if index + 1 < len(lines) and not lines[index + 1].startswith("["):
+            try:
+                cumulative_reward = float(lines[index + 1])
+            except ValueError:
+                cumulative_reward = None
+            index += 1
+        history.append((np.array(matrix, dtype=np.float64), cumulative_reward))
+        index += 1
+    history.reverse()
+    return history
@@ -1,5 +1,7 @@
 import logging
 
+import numpy as np
+
 from CoachingBehaviourTree import config
 from Policy.policy import Policy
 
@@ -29,6 +31,8 @@ class PolicyWrapper:
         Local method which creates the list of valid for each state of interaction.
     get_observation(state, behaviour)
         Obtain an observation from the underlying policy.
+    get_likely_behaviours(state, goal_level, performance, phase, count)
+        Find the valid behaviours the policy is most likely to generate from a state.
     """
     def __init__(self, belief=None, policy=None):
         self.policy = Policy(belief, policy)
@@ -49,6 +53,14 @@ class PolicyWrapper:
         valid_behaviours = self._get_valid_list(goal_level, performance, phase)
         if goal_level == config.PERSON_GOAL and phase == config.PHASE_END:
             behaviour = config.A_END
+        elif config.masked_sampling:
+            # Single draw from the policy renormalised over the valid behaviours. At the action goal level any invalid
+            # behaviour would be replaced by silence, so its probability is given to silence instead.
+            valid_mask = get_valid_mask(goal_level, performance, phase)
+            fold_into = config.A_SILENCE if goal_level == config.ACTION_GOAL else None
+            behaviour = self.policy.sample_action_masked(state, valid_mask, fold_into)
+            logging.debug("behaviour = %s. valid_behaviours: %s", behaviour, valid_behaviours)
+            return behaviour
         else:
             behaviour = self.policy.sample_action(state)
         # obs_behaviour = behaviour
@@ -110,187 +122,280 @@ class PolicyWrapper:
 
     def _get_valid_list(self, goal_level, performance, phase):
         """
-        Local method which creates the list of valid for each state of interaction.
+        Local method which looks up the set of valid behaviours for each state of interaction.
         :param goal_level :type int: the current goal level of the interaction.
         :param performance :type int: the performance of the user on their last action.
         :param phase :type int: the phase of the current goal level (either intro or feedback).
-        :return valid_list :type list[int]: a list of valid behaviours in the current interaction state.
+        :return valid_list :type frozenset[int]: the valid behaviours in the current interaction state.
         """
-        valid_list = []
-
         logging.debug('Getting valid list, goal_level = ' + str(goal_level) + ', performance = ' + str(performance) + ', phase = ' + str(phase))
-        # Person Goal
-        if goal_level == config.PERSON_GOAL:
-            logging.debug('Creating list for person goal')
-            if phase == config.PHASE_START:
-                valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_FIRSTNAME])
-            else:
-                valid_list.append(config.A_END)
+        return get_valid_behaviours(goal_level, performance, phase)
 
-        # Baseline Goal
-        elif goal_level == config.BASELINE_GOAL:
-            if phase == config.PHASE_START:
-                valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_QUESTIONING,
-                                   config.A_PREINSTRUCTION_FIRSTNAME,
-                                   config.A_PREINSTRUCTION_POSITIVEMODELING,
-                                   config.A_POSITIVEMODELING_PREINSTRUCTION])
-            else:
-                valid_list.append(config.A_PRAISE)
-
-        # Session, Exercise and Set Goals will all have the same action categories (different individual actions)
-        elif goal_level == config.SESSION_GOAL or goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-            valid_list.extend([config.A_POSTINSTRUCTIONPOSITIVE, config.A_POSTINSTRUCTIONNEGATIVE,
-                               config.A_QUESTIONING, config.A_POSTINSTRUCTIONPOSITIVE_QUESTIONING,
-                               config.A_POSTINSTRUCTIONPOSITIVE_FIRSTNAME,
-                               config.A_POSTINSTRUCTIONNEGATIVE_QUESTIONING, config.A_QUESTIONING_FIRSTNAME,
-                               config.A_POSTINSTRUCTIONNEGATIVE_FIRSTNAME])
+    def get_observation(self, state, behaviour):
+        """
+        Obtain an observation from the underlying policy.
+        :param state :type int: the previously observed state.
+        :param behaviour :type int: the previous behaviour generated by the policy.
+        :return:type int: the observation of which state we have moved to, generated by the policy.
+        """
+        return self.policy.sample_observation(state, behaviour)
+
+    def get_likely_behaviours(self, state, goal_level, performance, phase, count):
+        """
+        Find the valid behaviours the policy is most likely to generate from a state, e.g. so their utterances can be
+        prepared before the behaviour is chosen.
+        :param state :type int: the state the policy will generate the behaviour from.
+        :param goal_level :type int: the goal level of the interaction.
+        :param performance :type int: the performance of the user on their last action.
+        :param phase :type int: the phase of the goal level (either intro or feedback).
+        :param count :type int: the maximum number of behaviours to return.
+        :return:type list[int]: the most likely valid behaviours, most likely first. Behaviours the policy never
+            generates from the state are left out.
+        """
+        weights = np.where(get_valid_mask(goal_level, performance, phase), self.policy.get_matrix_array()[state], 0.0)
+        weights[config.A_MANUALMANIPULATION] = 0.0
+        likely = np.argsort(-weights, kind="stable")[:count]
+        return [int(behaviour) for behaviour in likely if weights[behaviour] > 0.0]
+
+    def get_matrix(self):
+        return self.policy.get_matrix()
+
+    def update_matrix(self, state, action, updatedValue):
+        self.policy.update(state, action, updatedValue)
+        return self.policy.get_matrix_array()
+
+    def get_matrix_array(self):
+        return self.policy.get_matrix_array()
+
+    def get_value(self, state, action):
+        return self.policy.get_value(state, action)
+
+    def get_eligibility_traces(self):
+        return self.policy.get_eligibility_traces()
+
+    def get_eligibility_traces_array(self):
+        return self.policy.get_eligibility_traces_array()
+
+    def get_trace(self, state, action):
+        return self.policy.get_trace(state, action)
+
+    def update_eligibility_traces(self, state, action, updatedValue):
+        self.policy.update_eligibility_traces(state, action, updatedValue)
+        return self.policy.get_eligibility_traces_array()
+
+    def apply_traced_update(self, step, decay):
+        self.policy.apply_traced_update(step, decay)
+
+
+def _create_valid_list(goal_level, performance, phase):
+    """
+    Creates the list of valid behaviours for a state of interaction. Only used to build VALID_BEHAVIOURS.
+    :param goal_level :type int: the current goal level of the interaction.
+    :param performance :type int: the performance of the user on their last action.
+    :param phase :type int: the phase of the current goal level (either intro or feedback).
+    :return valid_list :type list[int]: a list of valid behaviours in the current interaction state.
+    """
+    valid_list = []
+
+    # Person Goal
+    if goal_level == config.PERSON_GOAL:
+        if phase == config.PHASE_START:
+            valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_FIRSTNAME])
+        else:
+            valid_list.append(config.A_END)
+
+    # Baseline Goal
+    elif goal_level == config.BASELINE_GOAL:
+        if phase == config.PHASE_START:
+            valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_QUESTIONING,
+                               config.A_PREINSTRUCTION_FIRSTNAME,
+                               config.A_PREINSTRUCTION_POSITIVEMODELING,
+                               config.A_POSITIVEMODELING_PREINSTRUCTION])
+        else:
+            valid_list.append(config.A_PRAISE)
+
+    # Session, Exercise and Set Goals will all have the same action categories (different individual actions)
+    elif goal_level == config.SESSION_GOAL or goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+        valid_list.extend([config.A_POSTINSTRUCTIONPOSITIVE, config.A_POSTINSTRUCTIONNEGATIVE,
+                           config.A_QUESTIONING, config.A_POSTINSTRUCTIONPOSITIVE_QUESTIONING,
+                           config.A_POSTINSTRUCTIONPOSITIVE_FIRSTNAME,
+                           config.A_POSTINSTRUCTIONNEGATIVE_QUESTIONING, config.A_QUESTIONING_FIRSTNAME,
+                           config.A_POSTINSTRUCTIONNEGATIVE_FIRSTNAME])
+        if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+            valid_list.extend([config.A_QUESTIONING_POSITIVEMODELING, config.A_POSITIVEMODELING_QUESTIONING,
+                               config.A_POSTINSTRUCTIONPOSITIVE_POSITIVE_MODELING,
+                               config.A_POSTINSTRUCTIONPOSITIVE_NEGATIVE_MODELING,
+                               config.A_POSTINSTRUCTIONNEGATIVE_POSITIVEMODELING,
+                               config.A_POSTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
+                               config.A_QUESTIONING_NEGATIVEMODELING,
+                               config.A_POSITIVEMODELING_POSTINSTRUCTIONPOSITIVE,
+                               config.A_NEGATIVEMODELING_POSTINSTRUCTIONNEGATIVE])
+        if phase == config.PHASE_START:
+            valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_QUESTIONING,
+                               config.A_PREINSTRUCTION_FIRSTNAME])
             if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                valid_list.extend([config.A_QUESTIONING_POSITIVEMODELING, config.A_POSITIVEMODELING_QUESTIONING,
-                                   config.A_POSTINSTRUCTIONPOSITIVE_POSITIVE_MODELING,
-                                   config.A_POSTINSTRUCTIONPOSITIVE_NEGATIVE_MODELING,
-                                   config.A_POSTINSTRUCTIONNEGATIVE_POSITIVEMODELING,
-                                   config.A_POSTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                   config.A_QUESTIONING_NEGATIVEMODELING,
-                                   config.A_POSITIVEMODELING_POSTINSTRUCTIONPOSITIVE,
-                                   config.A_NEGATIVEMODELING_POSTINSTRUCTIONNEGATIVE])
-            if phase == config.PHASE_START:
-                valid_list.extend([config.A_PREINSTRUCTION, config.A_PREINSTRUCTION_QUESTIONING,
-                                   config.A_PREINSTRUCTION_FIRSTNAME])
+                valid_list.extend([config.A_PREINSTRUCTION_POSITIVEMODELING,
+                                   config.A_PREINSTRUCTION_NEGATIVEMODELING,
+                                   config.A_POSITIVEMODELING_PREINSTRUCTION])
+            if performance == config.MET:
+                valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
+                if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+                    valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
+            elif performance == config.MUCH_IMPROVED:
+                valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
+                if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+                    valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
+            elif performance == config.IMPROVED:
+                valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
+                if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+                    valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
+            elif performance == config.IMPROVED_SWAP:
+                valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
+                if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
+                    valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
+            elif performance == config.STEADY:
+                valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
                 if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                    valid_list.extend([config.A_PREINSTRUCTION_POSITIVEMODELING,
-                                       config.A_PREINSTRUCTION_NEGATIVEMODELING,
-                                       config.A_POSITIVEMODELING_PREINSTRUCTION])
-                if performance == config.MET:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
-                    if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                        valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
-                elif performance == config.MUCH_IMPROVED:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
-                    if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                        valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
-                elif performance == config.IMPROVED:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
-                    if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                        valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
-                elif performance == config.IMPROVED_SWAP:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
-                    if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                        valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
-                elif performance == config.STEADY:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME])
-                    if goal_level == config.EXERCISE_GOAL or goal_level == config.STAT_GOAL or goal_level == config.SET_GOAL:
-                        valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
-                elif performance == config.REGRESSED:
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-                elif performance == config.REGRESSED_SWAP:
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-                elif performance == config.MUCH_REGRESSED:  # performance == config.MUCH_REGRESSED
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-            else:  # phase == config.PHASE_END
-                if goal_level == config.SESSION_GOAL:
-                    valid_list.append(config.A_END)
-                if performance == config.MET:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                       config.A_POSITIVEMODELING_PRAISE])
-                elif performance == config.MUCH_IMPROVED:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                       config.A_POSITIVEMODELING_PRAISE])
-                elif performance == config.IMPROVED:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                       config.A_POSITIVEMODELING_PRAISE])
-                elif performance == config.IMPROVED_SWAP:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                       config.A_POSITIVEMODELING_PRAISE])
-                elif performance == config.STEADY:
-                    valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                       config.A_POSITIVEMODELING_PRAISE])
-                elif performance == config.REGRESSED:
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-                elif performance == config.REGRESSED_SWAP:
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-                elif performance == config.MUCH_REGRESSED:  # performance == config.MUCH_REGRESSED
-                    valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
-                                       config.A_CONSOLE_FIRSTNAME])
-
-        # Action Goal (each shot in squash or repetition of exercise in rehab)
-        else:  # goal_level == config.ACTION_GOAL:
-            valid_list.extend([config.A_SILENCE, config.A_CONCURRENTINSTRUCTIONPOSITIVE,
-                               config.A_QUESTIONING, config.A_POSITIVEMODELING, config.A_HUSTLE,
-                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_QUESTIONING,
-                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_FIRSTNAME,
-                               config.A_QUESTIONING_FIRSTNAME, config.A_HUSTLE_FIRSTNAME,
-                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_POSITIVEMODELING,
-                               config.A_POSITIVEMODELING_HUSTLE,
-                               config.A_POSITIVEMODELING_CONCURRENTINSTRUCTIONPOSITIVE])
-            # No phases in action goals, just a behaviour after each shot.
+                    valid_list.extend(([config.A_POSITIVEMODELING_PRAISE]))
+            elif performance == config.REGRESSED:
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
+            elif performance == config.REGRESSED_SWAP:
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
+            elif performance == config.MUCH_REGRESSED:  # performance == config.MUCH_REGRESSED
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
+        else:  # phase == config.PHASE_END
+            if goal_level == config.SESSION_GOAL:
+                valid_list.append(config.A_END)
             if performance == config.MET:
                 valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
                                    config.A_POSITIVEMODELING_PRAISE])
             elif performance == config.MUCH_IMPROVED:
                 valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
                                    config.A_POSITIVEMODELING_PRAISE])
             elif performance == config.IMPROVED:
                 valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
                                    config.A_POSITIVEMODELING_PRAISE])
             elif performance == config.IMPROVED_SWAP:
                 valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
                                    config.A_POSITIVEMODELING_PRAISE])
             elif performance == config.STEADY:
                 valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
                                    config.A_POSITIVEMODELING_PRAISE])
             elif performance == config.REGRESSED:
-                valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
-                                   config.A_SCOLD, config.A_CONSOLE,
-                                   config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
-                                   config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME,])
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
             elif performance == config.REGRESSED_SWAP:
-                valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
-                                   config.A_SCOLD, config.A_CONSOLE,
-                                   config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
-                                   config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME])
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
             elif performance == config.MUCH_REGRESSED:  # performance == config.MUCH_REGRESSED
-                valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
-                                   config.A_SCOLD, config.A_CONSOLE,
-                                   config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
-                                   config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
-                                   config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME])
+                valid_list.extend([config.A_SCOLD, config.A_CONSOLE, config.A_SCOLD_FIRSTNAME,
+                                   config.A_CONSOLE_FIRSTNAME])
 
-        return valid_list
+    # Action Goal (each shot in squash or repetition of exercise in rehab)
+    else:  # goal_level == config.ACTION_GOAL:
+        valid_list.extend([config.A_SILENCE, config.A_CONCURRENTINSTRUCTIONPOSITIVE,
+                           config.A_QUESTIONING, config.A_POSITIVEMODELING, config.A_HUSTLE,
+                           config.A_CONCURRENTINSTRUCTIONPOSITIVE_QUESTIONING,
+                           config.A_CONCURRENTINSTRUCTIONPOSITIVE_FIRSTNAME,
+                           config.A_QUESTIONING_FIRSTNAME, config.A_HUSTLE_FIRSTNAME,
+                           config.A_CONCURRENTINSTRUCTIONPOSITIVE_POSITIVEMODELING,
+                           config.A_POSITIVEMODELING_HUSTLE,
+                           config.A_POSITIVEMODELING_CONCURRENTINSTRUCTIONPOSITIVE])
+        # No phases in action goals, just a behaviour after each shot.
+        if performance == config.MET:
+            valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
+                               config.A_POSITIVEMODELING_PRAISE])
+        elif performance == config.MUCH_IMPROVED:
+            valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
+                               config.A_POSITIVEMODELING_PRAISE])
+        elif performance == config.IMPROVED:
+            valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
+                               config.A_POSITIVEMODELING_PRAISE])
+        elif performance == config.IMPROVED_SWAP:
+            valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
+                               config.A_POSITIVEMODELING_PRAISE])
+        elif performance == config.STEADY:
+            valid_list.extend([config.A_PRAISE, config.A_PRAISE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONPOSITIVE_PRAISE,
+                               config.A_POSITIVEMODELING_PRAISE])
+        elif performance == config.REGRESSED:
+            valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
+                               config.A_SCOLD, config.A_CONSOLE,
+                               config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
+                               config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME,])
+        elif performance == config.REGRESSED_SWAP:
+            valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
+                               config.A_SCOLD, config.A_CONSOLE,
+                               config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
+                               config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME])
+        elif performance == config.MUCH_REGRESSED:  # performance == config.MUCH_REGRESSED
+            valid_list.extend([config.A_CONCURRENTINSTRUCTIONNEGATIVE, config.A_NEGATIVEMODELING,
+                               config.A_SCOLD, config.A_CONSOLE,
+                               config.A_QUESTIONING_NEGATIVEMODELING, config.A_SCOLD_POSITIVEMODELING,
+                               config.A_SCOLD_FIRSTNAME, config.A_CONSOLE_FIRSTNAME,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_NEGATIVEMODELING,
+                               config.A_CONCURRENTINSTRUCTIONNEGATIVE_FIRSTNAME])
 
-    def get_observation(self, state, behaviour):
-        """
-        Obtain an observation from the underlying policy.
-        :param state :type int: the previously observed state.
-        :param behaviour :type int: the previous behaviour generated by the policy.
-        :return:type int: the observation of which state we have moved to, generated by the policy.
-        """
-        return self.policy.sample_observation(state, behaviour)
+    return valid_list
 
-    def get_matrix(self):
-        return self.policy.get_matrix()
 
-    def update_matrix(self, state, action, updatedValue):
-        self.policy.update(state, action, updatedValue)
-        return self.policy.get_matrix()
+# Every combination the tree can ask for. None is treated the same as -1 (unknown) for performance and phase.
+GOAL_LEVELS = [config.PERSON_GOAL, config.SESSION_GOAL, config.EXERCISE_GOAL, config.STAT_GOAL, config.SET_GOAL,
+               config.ACTION_GOAL, config.BASELINE_GOAL]
+PERFORMANCES = [-1, config.MET, config.MUCH_IMPROVED, config.IMPROVED, config.IMPROVED_SWAP, config.STEADY,
+                config.REGRESSED, config.REGRESSED_SWAP, config.MUCH_REGRESSED]
+PHASES = [-1, config.PHASE_START, config.PHASE_END]
 
-    def get_eligibility_traces(self):
-        return self.policy.get_eligibility_traces()
+VALID_BEHAVIOURS = {(goal_level, performance, phase): frozenset(_create_valid_list(goal_level, performance, phase))
+                    for goal_level in GOAL_LEVELS for performance in PERFORMANCES for phase in PHASES}
 
-    def update_eligibility_traces(self, state, action, updatedValue):
-        self.policy.update_eligibility_traces(state, action, updatedValue)
-        return self.policy.get_eligibility_traces()
+
+def _create_valid_mask(valid_behaviours):
+    mask = np.zeros(config.A_SILENCE + 1, dtype=bool)
+    mask[list(valid_behaviours)] = True
+    mask.flags.writeable = False
+    return mask
+
+
+VALID_MASKS = {key: _create_valid_mask(valid_behaviours) for key, valid_behaviours in VALID_BEHAVIOURS.items()}
+
+
+def get_valid_behaviours(goal_level, performance, phase):
+    """
+    Look up the behaviours which are valid in a given state of interaction.
+    :param goal_level :type int: the goal level of the interaction.
+    :param performance :type int: the performance of the user on their last action (None or -1 if unknown).
+    :param phase :type int: the phase of the goal level (None or -1 if unknown).
+    :return:type frozenset[int]: the valid behaviours.
+    """
+    key = (goal_level, -1 if performance is None else performance, -1 if phase is None else phase)
+    valid_behaviours = VALID_BEHAVIOURS.get(key)
+    if valid_behaviours is None:
+        valid_behaviours = frozenset(_create_valid_list(goal_level, performance, phase))
+    return valid_behaviours
+
+
+def get_valid_mask(goal_level, performance, phase):
+    """
+    Look up the behaviours which are valid in a given state of interaction as a boolean mask over all behaviours.
+    :param goal_level :type int: the goal level of the interaction.
+    :param performance :type int: the performance of the user on their last action (None or -1 if unknown).
+    :param phase :type int: the phase of the goal level (None or -1 if unknown).
+    :return:type np.ndarray: read-only boolean array, True at the index of each valid behaviour.
+    """
+    key = (goal_level, -1 if performance is None else performance, -1 if phase is None else phase)
+    valid_mask = VALID_MASKS.get(key)
+    if valid_mask is None:
+        valid_mask = _create_valid_mask(get_valid_behaviours(goal_level, performance, phase))
+    return valid_mask
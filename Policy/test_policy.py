@@ -0,0 +1,81 @@
+import numpy as np
+
+from CoachingBehaviourTree import config
+from Policy.policy import Policy
+
+
+def _nested_loop_update(matrix, traces, step, decay):
+    # The SARSA(lambda) sweep as controller.update() used to do it, over every (state, action) pair.
+    for s in range(len(matrix)):
+        if sum(traces[s]) >= config.trace_threshold:
+            for a in range(len(matrix[s])):
+                if traces[s][a] >= config.trace_threshold:
+                    matrix[s][a] = 0.0 if matrix[s][a] + step * traces[s][a] < 0.0 else matrix[s][a] + step * traces[s][a]
+                    traces[s][a] = decay * traces[s][a]
+
+
+def _random_policy_and_traces(rng, states=12, actions=54):
+    matrix = rng.uniform(0.0, 1.0, (states, actions))
+    traces = np.zeros((states, actions))
+    # Active traces, traces just below the threshold (which must be left alone) and traces at exactly the threshold.
+    traces[rng.random((states, actions)) < 0.2] = 1.0
+    traces[rng.random((states, actions)) < 0.1] = rng.uniform(0.1, 2.0)
+    traces[rng.random((states, actions)) < 0.1] = config.trace_threshold / 2
+    traces[0, :5] = config.trace_threshold
+    traces[1, :] = config.trace_threshold / 10  # Row sum >= threshold but every trace below it.
+    return matrix, traces
+
+
+def _build_policy(matrix, traces):
+    policy = Policy(policy=matrix.tolist())
+    for s, a in zip(*np.nonzero(traces)):
+        policy.update_eligibility_traces(int(s), int(a), float(traces[s, a]))
+    return policy
+
+
+def test_apply_traced_update_matches_nested_loop():
+    rng = np.random.default_rng(0)
+    matrix, traces = _random_policy_and_traces(rng)
+    policy = _build_policy(matrix, traces)
+    expected_matrix, expected_traces = matrix.tolist(), traces.tolist()
+    decay = config.gamma * config.lambdaValue
+
+    # Several steps so traces decay below the threshold, with positive and negative TD errors.
+    for td_error in [0.5, -0.2, 1.3, -0.05, 0.7, -0.4, 0.1, 0.9]:
+        step = config.alpha * td_error
+        _nested_loop_update(expected_matrix, expected_traces, step, decay)
+        policy.apply_traced_update(step, decay)
+
+        assert np.allclose(policy.get_matrix_array(), expected_matrix)
+        assert np.allclose(policy.get_eligibility_traces_array(), expected_traces)
+
+
+def test_apply_traced_update_clamps_at_zero():
+    rng = np.random.default_rng(1)
+    matrix, traces = _random_policy_and_traces(rng)
+    policy = _build_policy(matrix, traces)
+    expected_matrix, expected_traces = matrix.tolist(), traces.tolist()
+    decay = config.gamma * config.lambdaValue
+
+    # A TD error large enough to push every active value below zero.
+    step = config.alpha * -10.0
+    _nested_loop_update(expected_matrix, expected_traces, step, decay)
+    policy.apply_traced_update(step, decay)
+
+    result = policy.get_matrix_array()
+    assert np.allclose(result, expected_matrix)
+    assert np.allclose(policy.get_eligibility_traces_array(), expected_traces)
+    assert (result >= 0.0).all()
+    assert (result[traces >= 1.0] == 0.0).all()
+
+
+def test_apply_traced_update_leaves_traces_below_threshold():
+    rng = np.random.default_rng(2)
+    matrix, traces = _random_policy_and_traces(rng)
+    policy = _build_policy(matrix, traces)
+    below = (traces > 0.0) & (traces < config.trace_threshold)
+
+    policy.apply_traced_update(config.alpha * 0.5, config.gamma * config.lambdaValue)
+
+    assert np.array_equal(policy.get_matrix_array()[below], matrix[below])
+    assert np.array_equal(policy.get_eligibility_traces_array()[below], traces[below])
@@ -1,47 +1,595 @@
-if __name__ == '__main__':
-    import requests
+"""Simulator
+
+Headless stand-in for the guide app (the racket sensor app) and for the robot and its tablet screen, so the controller
+can be load-tested and its latency measured without a Pepper or the racket sensor. The simulator posts the guide
+protocol to the API's TimestepCue (/cue) for a synthetic participant: person goal, session goal, then for each shot an
+exercise goal with an optional baseline set, stat goals, set goals and a post for every shot played. The robot and
+screen stand-ins are local HTTP servers which accept everything the controller sends them, take as long to "say" each
+utterance as a person would, acknowledge utterances, answer the robot's questions and make shot/stat choices.
+
+The controller is run separately as usual, with config.post_address and config.screen_post_address pointing at the
+stand-ins (see the "Headless simulator" addresses in config.py). The simulator prints the latency of each kind of post
+to the API, and the time from each post until the robot is sent its next utterance, when the session finishes.
+
+Usage: python -m Simulator.simulator [--api API] [--shot-interval SECONDS] [--skill SKILL] [--stop-set-rate RATE] ...
+...
+Classes
+-------
+LatencyRecorder
+    Collects latency measurements by kind and summarises them.
+SyntheticParticipant
+    Generates the scores of a simulated participant.
+GuideSimulator
+    Drives the API through a coaching session as the guide app would.
+RobotStandIn
+    Local HTTP server standing in for the robot (config.post_address).
+ScreenStandIn
+    Local HTTP server standing in for the robot's tablet screen (config.screen_post_address).
+
+Methods
+-------
+main()
+    Parse the command line, start the stand-ins and simulate a session.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import requests
+
+from CoachingBehaviourTree import config
+
+# Unit suffix the guide app gives each stat's scores and targets in, which the API strips off before parsing.
+STAT_UNITS = {"racketPreparation": "%", "approachTiming": "%", "impactCutAngle": " degs", "impactSpeed": " mtrs/sec",
+              "followThroughTime": " secs", "followThroughRoll": " degs"}
+
+# Target for each stat, in the units above.
+STAT_TARGETS = {"racketPreparation": 80.0, "approachTiming": 80.0, "impactCutAngle": 20.0, "impactSpeed": 12.0,
+                "followThroughTime": 1.2, "followThroughRoll": 30.0}
+
+# Exercise and session scores are out of this (the API sets config.target to 5 for them), with this suffix after the
+# score which the API strips off before parsing.
+OVERALL_SCORE_MAX = 5.0
+OVERALL_SCORE_SUFFIX = "/"
+
+# Shot performance as shown by the guide app, for a shot score as a fraction of the target (lower bound).
+SHOT_PERFORMANCE_LEVELS = [(1.5, "Very High"), (1.1, "High"), (0.9, "Good!"), (0.5, "Low"), (0.0, "Very Low")]
+
+# Average speaking rate of the robot, used to decide how long an utterance takes to say.
+WORDS_PER_SECOND = 2.5
+
+
+class LatencyRecorder:
+    """
+    Collects latency measurements by kind, e.g. "set end" for the time the API took to respond to the end of a set.
+    ...
+    Attributes
+    ----------
+    latencies :type dict[str, list[float]]
+        The measurements of each kind, in seconds.
+
+    Methods
+    -------
+    record(kind, seconds)
+        Add a measurement.
+    cue_sent(kind)
+        Note that a post was sent to the API, so the robot's next utterance can be timed from it.
+    utterance_received()
+        Time the utterance the robot has just been sent from the last post to the API.
+    summary()
+        Summarise the measurements of each kind.
+    """
+    def __init__(self):
+        self.latencies = {}
+        self._lock = threading.Lock()
+        self._last_cue = None
+
+    def record(self, kind, seconds):
+        """
+        Add a measurement.
+        :param kind :type str: what was measured.
+        :param seconds :type float: the latency in seconds.
+        """
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+
+    def cue_sent(self, kind):
+        """
+        Note that a post was sent to the API, so the robot's next utterance can be timed from it.
+        :param kind :type str: the kind of post.
+        """
+        with self._lock:
+            self._last_cue = (kind, time.monotonic())
+
+    def utterance_received(self):
+        """
+        Time the utterance the robot has just been sent from the last post to the API. Only the first utterance after
+        each post is timed.
+        """
+        with self._lock:
+            last_cue, self._last_cue = self._last_cue, None
+        if last_cue is not None:
+            self.record(last_cue[0] + " -> utterance", time.monotonic() - last_cue[1])
+
+    def summary(self):
+        """
+        Summarise the measurements of each kind.
+        :return:type str: a table with the count, mean, median, 95th percentile and maximum latency of each kind, in
+            milliseconds.
+        """
+        lines = ["{:<32}{:>7}{:>10}{:>10}{:>10}{:>10}".format("kind", "count", "mean", "p50", "p95", "max")]
+        with self._lock:
+            latencies = {kind: sorted(values) for kind, values in self.latencies.items()}
+        for kind in sorted(latencies):
+            values = latencies[kind]
+            p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+            lines.append("{:<32}{:>7}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+                kind, len(values), 1000 * statistics.mean(values), 1000 * statistics.median(values), 1000 * p95,
+                1000 * values[-1]))
+        return "\n".join(lines)
+
+
+class SyntheticParticipant:
+    """
+    Generates the scores of a simulated participant. Each shot's score for a stat is drawn from a normal distribution
+    around the participant's skill (as a fraction of the stat's target), and their skill at a stat improves with each
+    set they play of it.
+    ...
+    Attributes
+    ----------
+    skill :type float
+        Mean shot score as a fraction of the target, before any practice.
+    spread :type float
+        Standard deviation of shot scores as a fraction of the target.
+    improvement :type float
+        Increase in skill for each set played of a stat.
+    rng :type random.Random
+        Source of randomness, seeded for reproducible sessions.
+
+    Methods
+    -------
+    shot_score(stat)
+        Draw the score of a single shot.
+    practised(stat)
+        Improve the participant's skill at a stat after a set.
+    performance(score, target, previous_score)
+        Work out the performance value for a set, stat or exercise.
+    """
+    def __init__(self, skill=0.8, spread=0.15, improvement=0.03, seed=None):
+        self.skill = skill
+        self.spread = spread
+        self.improvement = improvement
+        self.rng = random.Random(seed)
+        self._sets_played = {}
+
+    def shot_score(self, stat):
+        """
+        Draw the score of a single shot.
+        :param stat :type str: the stat being scored.
+        :return:type float: the score, in the stat's units.
+        """
+        skill = self.skill + self.improvement * self._sets_played.get(stat, 0)
+        return max(0.0, self.rng.gauss(skill, self.spread)) * STAT_TARGETS[stat]
+
+    def practised(self, stat):
+        """
+        Improve the participant's skill at a stat after a set.
+        :param stat :type str: the stat the set was played for.
+        """
+        self._sets_played[stat] = self._sets_played.get(stat, 0) + 1
+
+    @staticmethod
+    def performance(score, target, previous_score):
+        """
+        Work out the performance value for a set, stat or exercise.
+        :param score :type float: the score achieved.
+        :param target :type float: the target score.
+        :param previous_score :type float: the score achieved last time, or None.
+        :return:type int: the performance code, e.g. config.MET.
+        """
+        if score >= target:
+            return config.MET
+        if previous_score is None or score == previous_score:
+            return config.STEADY
+        return config.IMPROVED if score > previous_score else config.REGRESSED
+
+
+class GuideSimulator:
+    """
+    Drives the API through a coaching session as the guide app would, following the shots and stats the API chooses.
+    ...
+    Attributes
+    ----------
+    api :type str
+        Base address of the API, e.g. "http://localhost:5000".
+    participant :type SyntheticParticipant
+        Generates the scores of the simulated participant.
+    recorder :type LatencyRecorder
+        Records how long the API takes to respond to each post.
+    shot_interval :type float
+        Mean seconds between the participant's shots.
+    shots_per_set :type int
+        Number of shots played in each set.
+    stop_set_rate :type float
+        Probability that the participant stops any given set early.
+    stop_session_after :type float
+        Seconds after which the participant stops the session early, or None to play until the API finishes it.
 
-    # upload user stats (skill and sessions)
+    Methods
+    -------
+    run()
+        Simulate a whole coaching session.
+    """
+    def __init__(self, api, participant, recorder, shot_interval=3.0, shots_per_set=config.SHOTS_PER_SET,
+                 stop_set_rate=0.0, stop_session_after=None):
+        self.api = api.rstrip("/")
+        self.participant = participant
+        self.recorder = recorder
+        self.shot_interval = shot_interval
+        self.shots_per_set = shots_per_set
+        self.stop_set_rate = stop_set_rate
+        self.stop_session_after = stop_session_after
+        self._http = requests.Session()
+        self._start_time = None
+        self._session_stopped = False
+        self._previous_scores = {}
 
-    # wait for player goal to be created (while loop with get request until we get data?)
-    # create goal on guide side and put completed=false, performance, target and score information
+    def run(self):
+        """
+        Simulate a whole coaching session: the person and session goals, then each shot chosen by the API until it
+        marks one as final, then the end of the session.
+        """
+        self._start_time = time.monotonic()
+        self._cue("person", {"goal_level": config.PERSON_GOAL})
+        response = self._cue("session start", {"goal_level": config.SESSION_GOAL})
+        shot, hand = _shot_name(response.get("shotType")), response.get("hand")
+        exercise_scores = []
+        while shot is not None:
+            logging.info("Starting shot " + str(hand) + " " + str(shot))
+            response = self._cue("exercise start", {"goal_level": config.EXERCISE_GOAL, "impactSpeed": "null",
+                                                    "shotType": shot, "hand": hand})
+            stat = response.get("stat")
+            if not stat:
+                stat = self._play_baseline()
+            stat_scores = []  # Out of OVERALL_SCORE_MAX, where a score on each stat's target is full marks.
+            while stat:
+                score = self._play_stat(stat)
+                stat_scores.append(OVERALL_SCORE_MAX * min(1.0, score / STAT_TARGETS[stat]))
+                response = self._end_stat(stat, score)
+                stat = None if response.get("final") or self._session_stopped else response.get("stat")
+            exercise_score = statistics.mean(stat_scores) if stat_scores else 0.0
+            exercise_scores.append(exercise_score)
+            response = self._cue("exercise end", {"goal_level": config.EXERCISE_GOAL, "feedback": "1",
+                                                  "score": _format_overall_score(exercise_score),
+                                                  "performance": str(self._performance("exercise", exercise_score,
+                                                                                       OVERALL_SCORE_MAX))})
+            if response.get("final") or self._session_stopped:
+                break
+            shot, hand = _shot_name(response.get("shotType")), response.get("hand")
+        session_score = statistics.mean(exercise_scores) if exercise_scores else 0.0
+        self._cue("session end", {"goal_level": config.SESSION_GOAL, "feedback": "1",
+                                  "score": _format_overall_score(session_score),
+                                  "performance": str(self._performance("session", session_score,
+                                                                       OVERALL_SCORE_MAX))})
+        logging.info("Session finished after " + str(round(time.monotonic() - self._start_time)) + " seconds")
 
-    # wait for session goal to be created
-    # create session goal on guide side and put completed=false, performance information (from last session)
+    def _cue(self, kind, content):
+        self.recorder.cue_sent(kind)
+        start = time.monotonic()
+        response = self._http.post(self.api + "/cue", json=content)
+        self.recorder.record(kind, time.monotonic() - start)
+        if response.status_code != 200:
+            logging.warning(kind + " returned " + str(response.status_code))
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        logging.debug(kind + ": " + str(content) + " -> " + str(data))
+        return data if isinstance(data, dict) else {}
 
-    # loop until session goal == completed
+    def _play_baseline(self):
+        # The baseline set scores every stat from the same shots, and the API chooses the first stat from the result.
+        self._cue("baseline start", {"goal_level": config.SET_GOAL})
+        self._play_shots("racketPreparation")
+        content = {"goal_level": config.EXERCISE_GOAL, "impactSpeed": "0",
+                   "score": str(round(self.participant.skill * 100, 2))}
+        for stat in STAT_UNITS:
+            score = statistics.mean(self.participant.shot_score(stat) for _ in range(self.shots_per_set))
+            content[stat + "Acc"] = str(round(100 * min(1.0, score / STAT_TARGETS[stat]), 2))
+            content[stat + "Score"] = _format_score(score, stat)
+            content[stat + "Target"] = _format_score(STAT_TARGETS[stat], stat)
+        response = self._cue("baseline end", content)
+        if response.get("stop_on_baseline") == "1":
+            return None
+        return response.get("stat")
 
-    #   wait for shot goal to be created (with optional shot-choice from user)
-    #   create shot goal on guide side (possibly with shot-choice from user or possibly put guide-generated shot choice)
-    #     and put completed=false, performance information (from last time they worked on this shot)
+    def _play_stat(self, stat):
+        target = STAT_TARGETS[stat]
+        self._cue("stat start", {"goal_level": config.STAT_GOAL, "stat": stat,
+                                 "tgtValue": _format_score(target, stat)})
+        set_scores = []
+        while True:
+            self._cue("set start", {"goal_level": config.SET_GOAL})
+            set_scores.append(self._play_shots(stat))
+            self.participant.practised(stat)
+            response = self._cue("set end", {"goal_level": config.SET_GOAL,
+                                             "score": _format_score(set_scores[-1], stat),
+                                             "tgtValue": _format_score(target, stat),
+                                             "performance": str(self._performance(stat, set_scores[-1], target))})
+            if response.get("final") or self._session_stopped:
+                return statistics.mean(set_scores)
 
-    #   loop until shot goal == completed
+    def _end_stat(self, stat, score):
+        target = STAT_TARGETS[stat]
+        return self._cue("stat end", {"goal_level": config.STAT_GOAL, "feedback": "1",
+                                      "score": _format_score(score, stat), "tgtValue": _format_score(target, stat),
+                                      "performance": str(self._performance(stat, score, target)),
+                                      "accuracy": str(round(100 * min(1.0, score / target), 2))})
 
-    #       wait for stat/baseline goal to be created
-    #       if baseline goal, create baseline goal and put completed=false
-    #           wait for completed == true, end baseline goal and use that to generate shot choice
-    #           wait for stat goal to be created
-    #           create stat goal on guide side and put completed=false, stat choice, plus performance, target and score
-    #             information (from last time they worked on this stat)
-    #       else if stat goal,
-    #           create stat goal on guide side and put completed=false, performance, target and score information (from
-    #             last time they worked on this stat) (user's stat-choice)
+    def _play_shots(self, stat):
+        # Stop the set after a random shot if the participant stops it early.
+        if self.participant.rng.random() < self.stop_set_rate:
+            shots = self.participant.rng.randint(1, self.shots_per_set - 1)
+        else:
+            shots = self.shots_per_set
+        scores = []
+        for _ in range(shots):
+            if self._session_stopped:
+                break
+            time.sleep(self.participant.rng.uniform(0.5, 1.5) * self.shot_interval)
+            score = self.participant.shot_score(stat)
+            scores.append(score)
+            self._cue("shot", {"goal_level": config.ACTION_GOAL, "score": str(round(score, 2)),
+                               "performance": _shot_performance(score, STAT_TARGETS[stat])})
+            if self.stop_session_after is not None and not self._session_stopped \
+                    and time.monotonic() - self._start_time > self.stop_session_after:
+                logging.info("Participant stopping the session")
+                self._session_stopped = True
+                self._cue("session stop", {"goal_level": config.SESSION_GOAL, "stop": "1"})
+        if shots < self.shots_per_set and not self._session_stopped:
+            logging.info("Participant stopping the set after " + str(shots) + " shots")
+            self._cue("set stop", {"goal_level": config.EXERCISE_GOAL, "stop": "1"})
+        return statistics.mean(scores) if scores else 0.0
 
-    #       loop until stat goal == completed
+    def _performance(self, key, score, target):
+        performance = self.participant.performance(score, target, self._previous_scores.get(key))
+        self._previous_scores[key] = score
+        return performance
 
-    #           wait for set goal to be created
-    #           create goal on guide side and put completed=false
 
-    #           loop until set goal == completed
+class RobotStandIn(ThreadingHTTPServer):
+    """
+    Local HTTP server standing in for the robot at config.post_address. Each utterance takes as long to "say" as a
+    person would take. If acks is True, the robot responds straight away and posts to /utterance_complete when it has
+    finished (config.robot_sends_utterance_acks should then be True too), otherwise it holds its response until it has
+    finished. Feedback questions are answered by posting a questionResponse to /cue.
+    ...
+    Attributes
+    ----------
+    api :type str
+        Base address of the API.
+    recorder :type LatencyRecorder
+        Times each utterance from the last post to the API.
+    acks :type bool
+        Whether to acknowledge utterances through /utterance_complete.
+    speech_rate :type float
+        Multiplier for the time taken to say each utterance, e.g. 0 to finish speaking straight away.
+    prefetched_demos :type set[str]
+        Every demo the controller has asked the robot to prefetch.
+    demos_shown :type list[str]
+        Every demo the robot has been asked to show, in order.
+    rng :type random.Random
+        Source of randomness for answering questions.
+    """
+    def __init__(self, port, api, recorder, acks=False, speech_rate=1.0, seed=None):
+        super().__init__(("", port), _RobotHandler)
+        self.daemon_threads = True
+        self.api = api.rstrip("/")
+        self.recorder = recorder
+        self.acks = acks
+        self.speech_rate = speech_rate
+        self.prefetched_demos = set()
+        self.demos_shown = []
+        self.rng = random.Random(seed)
 
-    #               wait for action goal to be created
-    #               continually post shot scores after each shot the user plays, deleting all previously posted scores
-    #                 each shot
+    def speech_time(self, utterance):
+        """
+        :param utterance :type str: the utterance to say.
+        :return:type float: the seconds the robot takes to say the utterance.
+        """
+        return self.speech_rate * len(utterance.split()) / WORDS_PER_SECOND
 
-    #           end set goal on guide side and put performance, target and avg_score info for set just completed
 
-    #       end stat goal on guide side and put performance, target and avg_score info for stat just completed
+class _RobotHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        robot = self.server
+        content = _read_json(self)
+        if "prefetch_demos" in content:
+            robot.prefetched_demos.update(content["prefetch_demos"])
+        if "utterance" in content:
+            robot.recorder.utterance_received()
+            logging.info("Robot: " + content["utterance"])
+            if "demo" in content:
+                if content["demo"] not in robot.prefetched_demos:
+                    logging.debug("Robot loading demo " + content["demo"] + " which wasn't prefetched")
+                robot.demos_shown.append(content["demo"])
+            speech_time = robot.speech_time(content["utterance"])
+            if robot.acks and "utterance_id" in content:
+                threading.Timer(speech_time, self._utterance_finished, (content,)).start()
+            else:
+                time.sleep(speech_time)
+                self._answer_question(content)
+        self.send_response(200)
+        self.end_headers()
 
-    #   end shot goal on guide side and put performance, target and avg_score info for shot just completed
+    def _utterance_finished(self, content):
+        robot = self.server
+        _post(robot.api + "/utterance_complete", {"utterance_id": content["utterance_id"]})
+        self._answer_question(content)
 
-    # end session goal on guide side and put performance, target and avg_score info for session just completed
+    def _answer_question(self, content):
+        if content.get("question") in ("GoodBad", "FirstTime"):
+            answer = "Pos" if self.server.rng.random() < 0.5 else "Neg"
+            _post(self.server.api + "/cue", {"questionResponse": answer})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ScreenStandIn(ThreadingHTTPServer):
+    """
+    Local HTTP server standing in for the robot's tablet screen at config.screen_post_address. When the screen offers
+    the participant the option to override the coach's choice of shot or stat, the participant overrides it with
+    probability override_rate, and if they are then asked to choose, they choose at random.
+    ...
+    Attributes
+    ----------
+    api :type str
+        Base address of the API.
+    override_rate :type float
+        Probability that the participant overrides the coach's choice.
+    choice_delay :type float
+        Seconds the participant takes to make a choice on the screen.
+    rep_count :type int
+        The latest rep count shown on the screen.
+    rng :type random.Random
+        Source of randomness for the participant's choices.
+    """
+    def __init__(self, port, api, override_rate=0.0, choice_delay=1.0, seed=None):
+        super().__init__(("", port), _ScreenHandler)
+        self.daemon_threads = True
+        self.api = api.rstrip("/")
+        self.override_rate = override_rate
+        self.choice_delay = choice_delay
+        self.rep_count = 0
+        self.rng = random.Random(seed)
+
+
+class _ScreenHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        screen = self.server
+        _read_json(self)
+        parts = unquote(self.path).strip("/").split("/")
+        if parts[-1] == "newRep":
+            screen.rep_count = int(parts[0])
+        elif parts[-1] == "overrideOption":
+            # <utterance>/<"pre" or "question">/<"shot" or "stat">/overrideOption
+            threading.Thread(target=self._choose, args=(parts[-3], parts[-2]), daemon=True).start()
+        self.send_response(200)
+        self.end_headers()
+
+    def _choose(self, option, choice_type):
+        screen = self.server
+        time.sleep(screen.choice_delay)
+        override = screen.rng.random() < screen.override_rate
+        _post(screen.api + "/cue", {"override": str(override)})
+        # The participant chooses if they were asked to, or if they overrode the coach choosing for them.
+        if (option == "question") != override:
+            time.sleep(screen.choice_delay)
+            if choice_type == "shot":
+                shot = screen.rng.choice(sorted(config.shot_list_master))
+                _post(screen.api + "/cue", {"shot_selection": shot, "hand": screen.rng.choice(["FH", "BH"])})
+            else:
+                _post(screen.api + "/cue", {"stat_selection": screen.rng.choice(sorted(STAT_UNITS))})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _read_json(handler):
+    length = int(handler.headers.get("Content-Length") or 0)
+    if length == 0:
+        return {}
+    try:
+        content = json.loads(handler.rfile.read(length))
+    except ValueError:
+        return {}
+    return content if isinstance(content, dict) else {}
+
+
+def _post(url, content):
+    try:
+        requests.post(url, json=content, timeout=config.http_connect_timeout)
+    except requests.RequestException as e:
+        logging.warning("Post to " + url + " failed: " + str(e))
+
+
+def _shot_name(code):
+    for name, shot_code in config.shot_list_master.items():
+        if shot_code == code or name == code:
+            return name
+    return None
+
+
+def _format_score(score, stat):
+    return str(round(score, 2)) + STAT_UNITS[stat]
+
+
+def _format_overall_score(score):
+    return str(round(score, 2)) + OVERALL_SCORE_SUFFIX
+
+
+def _shot_performance(score, target):
+    for level, performance in SHOT_PERFORMANCE_LEVELS:
+        if score >= level * target:
+            return performance
+    return SHOT_PERFORMANCE_LEVELS[-1][1]
+
+
+def main():
+    """
+    Parse the command line, start the robot and screen stand-ins and simulate a coaching session.
+    """
+    parser = argparse.ArgumentParser(description="Simulate the guide app, robot and screen for a coaching session.")
+    parser.add_argument("--api", default="http://localhost:5000", help="address of the controller's API")
+    parser.add_argument("--robot-port", type=int, default=4999, help="port for the robot stand-in")
+    parser.add_argument("--screen-port", type=int, default=8000, help="port for the screen stand-in")
+    parser.add_argument("--shot-interval", type=float, default=3.0, help="mean seconds between shots")
+    parser.add_argument("--shots-per-set", type=int, default=config.SHOTS_PER_SET, help="shots in each set")
+    parser.add_argument("--skill", type=float, default=0.8, help="mean shot score as a fraction of the target")
+    parser.add_argument("--spread", type=float, default=0.15, help="standard deviation of shot scores, as a fraction "
+                                                                   "of the target")
+    parser.add_argument("--improvement", type=float, default=0.03, help="increase in skill for each set of a stat")
+    parser.add_argument("--stop-set-rate", type=float, default=0.0, help="probability of stopping a set early")
+    parser.add_argument("--stop-session-after", type=float, default=None,
+                        help="seconds after which the participant stops the session early")
+    parser.add_argument("--override-rate", type=float, default=0.0,
+                        help="probability of overriding the coach's shot/stat choice")
+    parser.add_argument("--speech-rate", type=float, default=1.0,
+                        help="multiplier for the robot's speaking time, 0 to speak instantly")
+    parser.add_argument("--acks", action="store_true", help="acknowledge utterances through /utterance_complete")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible participant")
+    parser.add_argument("--verbose", action="store_true", help="log every post")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(message)s")
+
+    recorder = LatencyRecorder()
+    robot = RobotStandIn(args.robot_port, args.api, recorder, args.acks, args.speech_rate, args.seed)
+    screen = ScreenStandIn(args.screen_port, args.api, args.override_rate, seed=args.seed)
+    for server in (robot, screen):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    participant = SyntheticParticipant(args.skill, args.spread, args.improvement, args.seed)
+    simulator = GuideSimulator(args.api, participant, recorder, args.shot_interval, args.shots_per_set,
+                               args.stop_set_rate, args.stop_session_after)
+    try:
+        simulator.run()
+    except KeyboardInterrupt:
+        logging.info("Simulation interrupted")
+    finally:
+        robot.shutdown()
+        screen.shutdown()
+    print(recorder.summary())
+    if robot.demos_shown:
+        prefetched = sum(1 for demo in robot.demos_shown if demo in robot.prefetched_demos)
+        print("Demos shown: " + str(len(robot.demos_shown)) + ", prefetched: " + str(prefetched))
+
+
+if __name__ == '__main__':
+    main()